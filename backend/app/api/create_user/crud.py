@@ -1,11 +1,11 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.create_user.schema import create_user_schema
 from app.db.models.user import User as user_model
 from datetime import datetime, timedelta, timezone
 from app.utils.password import hash_password, verify_password
 
 
-def create_user(db: Session, user: create_user_schema):
+async def create_user(db: AsyncSession, user: create_user_schema):
     expiration_date = datetime.now(timezone.utc) + timedelta(days=7)
     hashed_password = hash_password(user.password)
     # verifiedTest = verify_password(hashed_password, user.password)
@@ -18,6 +18,6 @@ def create_user(db: Session, user: create_user_schema):
         expired_at=expiration_date,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
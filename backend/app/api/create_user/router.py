@@ -1,6 +1,6 @@
 from fastapi import APIRouter,  Depends, HTTPException
 from app.db.database import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.create_user.crud import create_user as create_user_crud
 from app.api.share_crud import get_user_by_email
 from app.api.create_user.schema import create_user_schema
@@ -10,12 +10,12 @@ router = APIRouter()
 
 
 @router.post("/create_user/", response_model=user_schema)
-async def create_user(user: create_user_schema, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, email=user.email)
+async def create_user(user: create_user_schema, db: AsyncSession = Depends(get_db)):
+    db_user = await get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    result = create_user_crud(db=db, user=user)
+    result = await create_user_crud(db=db, user=user)
     # sendEmailResult = await send_email(to_addresses=[result.email], subject="이메일 인증", html_body=result.validation_number)
     # print("sendEmailResult check: ",sendEmailResult)
     return result
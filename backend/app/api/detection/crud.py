@@ -0,0 +1,114 @@
+from datetime import datetime
+from typing import List
+
+import pytz
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.predict_fire.crud import add_detection_log, increment_detection_counts
+from app.db.models.detection_event import (
+    EVENT_CLOSED,
+    EVENT_INTERRUPTED,
+    EVENT_OPEN,
+    DetectionEvent,
+)
+from app.utils.postprocess import Detections, build_detection_log
+from app.utils.render import result_image_name, schedule_result_image
+
+
+def to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, pytz.UTC)
+
+
+def peak_detection(track) -> dict:
+    return {
+        "class_name": track.class_name,
+        "confidence": track.peak_confidence,
+        "bbox": track.peak_bbox,
+    }
+
+
+def add_open_events(db: AsyncSession, tracks: list) -> None:
+    """
+    stage a row for each newly opened event (no commit)
+    """
+    db.add_all(
+        DetectionEvent(
+            id=track.event_id,
+            camera_id=track.camera[1],
+            user_id=track.camera[0],
+            class_name=track.class_name,
+            status=EVENT_OPEN,
+            started_at=to_datetime(track.started_at),
+            peak_confidence=track.peak_confidence,
+            frame_count=track.hits,
+            bbox=track.peak_bbox,
+        )
+        for track in tracks
+    )
+
+
+async def close_events(db: AsyncSession, tracks: list) -> None:
+    """
+    finish closed events (no commit): final stats, the representative frame and one
+    detection log per event, so /get_detection_log lists events instead of frames
+    """
+    for track in tracks:
+        detection = peak_detection(track)
+        result_image = None
+        if track.peak_frame is not None:
+            # rendered once per event, from the frame with the highest confidence
+            result_image = result_image_name()
+            schedule_result_image(result_image, track.peak_frame, [detection])
+
+        detection_data = build_detection_log(
+            Detections.from_list([detection]),
+            f"Detection event closed: {track.class_name}, {track.hits} frames",
+            file_name=track.camera[1],
+        )
+        detection_data["result_image"] = result_image
+        _, keys = add_detection_log(db, detection_data)
+        await increment_detection_counts(db, keys)
+
+        await db.execute(
+            update(DetectionEvent)
+            .where(DetectionEvent.id == track.event_id)
+            .values(
+                status=EVENT_CLOSED,
+                ended_at=to_datetime(track.last_seen),
+                peak_confidence=track.peak_confidence,
+                frame_count=track.hits,
+                bbox=track.peak_bbox,
+                result_image=result_image,
+                log_id=detection_data["id"],
+            )
+        )
+        # the frame is not needed anymore
+        track.peak_frame = None
+
+
+async def save_events(db: AsyncSession, opened: List, closed: List) -> None:
+    """
+    write opened and closed events in one transaction; frames without either write nothing
+    """
+    if not opened and not closed:
+        return
+    add_open_events(db, opened)
+    if closed:
+        # an event can open and close within one call: insert before updating
+        await db.flush()
+        await close_events(db, closed)
+    await db.commit()
+
+
+async def interrupt_open_events(db: AsyncSession) -> int:
+    """
+    events left open by a previous run cannot be closed anymore (the tracks were in memory)
+    """
+    result = await db.execute(
+        update(DetectionEvent)
+        .where(DetectionEvent.status == EVENT_OPEN)
+        .values(status=EVENT_INTERRUPTED)
+    )
+    await db.commit()
+    return result.rowcount
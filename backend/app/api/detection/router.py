@@ -1,13 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.api.share_schema import DetectionResponse
-from app.utils.auth import get_current_user
-from ultralytics import YOLO
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    UploadFile,
+    File,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_db, AsyncSessionLocal
+from app.api.detection.crud import save_events
+from app.models.detection import DetectionResponse, StreamDetectionResponse
+from app.utils.log_writer import save_detection_log
+from app.utils.auth import get_current_user, verify_token
+from app.utils.model_registry import class_names, registry
+from app.utils.batching import scheduler
+from app.utils.executor import executor
+from app.utils.image import decode_image
+from app.utils.motion import MOTION_GATE, MotionGate, motion_gates, motion_thumbnail
+from app.utils.tracking import close_tracks, event_tracker
+from app.utils.video import analyze_video
+from app.utils.postprocess import Detections, build_detection_log
+from app.utils.responses import encode, respond, wants_msgpack
+from app.utils import storage
+from typing import Optional, Tuple
 import numpy as np
-import cv2
-from datetime import datetime
-import pytz
+import asyncio
 import logging
 import tempfile
 import os
@@ -15,73 +36,201 @@ import os
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Initialize YOLO model
-try:
-    model = YOLO("app/assets/best.pt")
-    logger.info("YOLO model loaded successfully")
-except Exception as e:
-    logger.error(f"Failed to load YOLO model: {str(e)}")
+# uploads are written to disk in chunks of this size, never held in memory whole
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
-@router.post("/detect/stream", response_model=DetectionResponse)
+
+def event_ids(opened: list, closed: list) -> dict:
+    return {
+        "opened": [track.event_id for track in opened],
+        "closed": [track.event_id for track in closed],
+    }
+
+
+def gated(motion_gate: Optional[bool]) -> bool:
+    return MOTION_GATE if motion_gate is None else motion_gate
+
+
+async def detect_frame(
+    contents: bytes, gate: Optional[MotionGate] = None
+) -> Tuple[Detections, Optional[np.ndarray]]:
+    """
+    detections of an encoded frame and the decoded image; with a motion gate, an unchanged
+    scene reuses the last analyzed frame's detections and the image is None (not decoded).
+    raises ValueError if the frame cannot be decoded
+    """
+    thumbnail = None
+    if gate is not None:
+        thumbnail = await executor.run(motion_thumbnail, contents)
+        if thumbnail is None:
+            raise ValueError("failed to decode frame")
+        previous = gate.check(thumbnail)
+        if previous is not None:
+            return previous, None
+
+    img = await executor.run(decode_image, contents)
+    if img is None:
+        raise ValueError("failed to decode frame")
+    # Perform YOLO detection
+    result = await scheduler.infer("fire", img)
+    detections = Detections.from_result(result, await class_names("fire"))
+    if gate is not None:
+        gate.analyzed(thumbnail, detections)
+    return detections, img
+
+
+@router.post("/detect/stream", response_model=StreamDetectionResponse)
 async def detect_stream(
+    request: Request,
     frame: UploadFile = File(...),
-    user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    camera_id: str = Query("default", description="frames of one camera are tracked together"),
+    motion_gate: Optional[bool] = Query(
+        None, description="skip inference while the scene is unchanged (default: MOTION_GATE)"
+    ),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     # Read frame
     contents = await frame.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    
-    # Perform YOLO detection
-    results = model(img)
-    result = results[0]
-    
-    # Process detections
-    detections = []
-    has_fire = False
-    confidence_score = 0.0
-    
-    for box in result.boxes:
-        class_name = model.names[int(box.cls)]
-        confidence = float(box.conf)
-        bbox = box.xyxy[0].tolist()
-        
-        detections.append({
-            "class_name": class_name,
-            "confidence": confidence,
-            "bbox": bbox
-        })
-        
-        if class_name == "fire":
-            has_fire = True
-            confidence_score = max(confidence_score, confidence)
-    
-    # Create detection log
-    detection_log = DetectionLog(
-        user_id=user_id,
-        source_type="camera",
-        detections=detections,
-        confidence_score=confidence_score,
-        has_fire=has_fire,
-        created_at=datetime.now(pytz.UTC)
-    )
-    db.add(detection_log)
-    db.commit()
-    
-    return DetectionResponse(
-        id=detection_log.id,
-        has_fire=has_fire,
-        confidence_score=confidence_score,
-        detections=detections,
-        message="Detection completed"
+    camera = (current_user["user_id"], camera_id)
+    gate = motion_gates.get(camera) if gated(motion_gate) else None
+
+    try:
+        detections, img = await detect_frame(contents, gate)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Failed to decode frame")
+
+    # consecutive detections of an object form one event; the database is written only
+    # when an event opens or closes, not for every frame
+    opened, closed = event_tracker.update(camera, detections, img)
+    await save_events(db, opened, closed)
+
+    detection_data = build_detection_log(detections, "Detection completed")
+    # plain dict of model output: serialized without a response_model pass
+    return respond(
+        request,
+        {
+            **detection_data,
+            "camera_id": camera_id,
+            "analyzed": img is not None,
+            "events": event_ids(opened, closed),
+        },
     )
 
+
+@router.websocket("/detect/ws")
+async def detect_ws(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    camera_id: str = "default",
+    motion_gate: Optional[bool] = None,
+):
+    """
+    live camera detection: authenticate once, then send binary JPEG frames and
+    receive one JSON result per analyzed frame (msgpack binary messages when the
+    handshake sends "Accept: application/msgpack"). when inference falls behind,
+    older frames are dropped and only the latest one is analyzed.
+    detections are tracked into events per camera_id; events close on disconnect.
+    with the motion gate, frames of an unchanged scene reuse the previous result.
+    """
+    authorization = websocket.headers.get("authorization")
+    if not token and authorization:
+        token = authorization.replace("Bearer ", "")
+    if not token:
+        await websocket.close(code=1008)
+        return
+
+    try:
+        current_user = await run_in_threadpool(verify_token, token)
+    except Exception:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    use_msgpack = wants_msgpack(websocket)
+
+    async def send(message: dict):
+        if use_msgpack:
+            await websocket.send_bytes(encode(message, use_msgpack=True))
+        else:
+            await websocket.send_text(encode(message).decode())
+
+    logger.info(f"Camera stream opened for user: {current_user['user_id']}")
+
+    latest = {"frame": None, "received": 0, "dropped": 0}
+    frame_ready = asyncio.Event()
+
+    async def receive_frames():
+        while True:
+            data = await websocket.receive_bytes()
+            if latest["frame"] is not None:
+                latest["dropped"] += 1
+            latest["frame"] = data
+            latest["received"] += 1
+            frame_ready.set()
+
+    receiver = asyncio.create_task(receive_frames())
+    camera = (current_user["user_id"], camera_id)
+    # one connection is one camera: the gate lives as long as the stream
+    gate = MotionGate() if gated(motion_gate) else None
+    db = AsyncSessionLocal()
+    try:
+        while True:
+            waiter = asyncio.create_task(frame_ready.wait())
+            done, _ = await asyncio.wait(
+                {receiver, waiter}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if receiver in done:
+                waiter.cancel()
+                break
+
+            frame_ready.clear()
+            contents, latest["frame"] = latest["frame"], None
+            frame_number = latest["received"]
+
+            try:
+                detections, img = await detect_frame(contents, gate)
+            except ValueError:
+                await send({"error": "Failed to decode frame"})
+                continue
+            except HTTPException as e:
+                # server is busy: skip this frame, the next one is already coming
+                await send({"error": e.detail})
+                continue
+
+            opened, closed = event_tracker.update(camera, detections, img)
+            await save_events(db, opened, closed)
+
+            detection_data = build_detection_log(detections, "Detection completed")
+            await send({
+                **detection_data,
+                "camera_id": camera_id,
+                "analyzed": img is not None,
+                "events": event_ids(opened, closed),
+                "frame": frame_number,
+                "dropped": latest["dropped"],
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        await asyncio.gather(receiver, return_exceptions=True)
+        await db.close()
+        # the stream is over: its open events end with the last frame they were seen in
+        try:
+            await close_tracks(event_tracker.close_camera(camera))
+        except Exception as e:
+            logger.error(f"failed to close detection events: {str(e)}")
+        logger.info(f"Camera stream closed for user: {current_user['user_id']}")
+
+
 @router.post("/detect/upload", response_model=DetectionResponse)
 async def detect_upload(
+    request: Request,
     video: UploadFile = File(...),
-    user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    frame_stride: int = Query(30, ge=1, description="analyze every n-th frame"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     if not video:
         raise HTTPException(status_code=400, detail="No video file provided")
@@ -90,72 +239,42 @@ async def detect_upload(
     if not video.content_type.startswith('video/'):
         raise HTTPException(status_code=400, detail="File must be a video")
 
-    # Save uploaded video to temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
+    _, suffix = os.path.splitext(video.filename or "")
+    temp_file = tempfile.NamedTemporaryFile(
+        delete=False, suffix=suffix or ".mp4", dir=storage.TEMP_DIR
+    )
+    temp_path = temp_file.name
+    try:
+        # Save uploaded video to temporary file chunk by chunk
+        with temp_file:
+            while chunk := await video.read(UPLOAD_CHUNK_SIZE):
+                await run_in_threadpool(temp_file.write, chunk)
+
         try:
-            contents = await video.read()
-            temp_file.write(contents)
-            temp_path = temp_file.name
+            # decode and run the model off the event loop
+            all_detections = await executor.run(analyze_video, temp_path, frame_stride)
 
-            try:
-                # Open video file
-                cap = cv2.VideoCapture(temp_path)
-                all_detections = []
-                frame_count = 0
-
-                while cap.isOpened():
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-
-                    # Process every 30th frame (adjust as needed)
-                    if frame_count % 30 == 0:
-                        # Convert frame to bytes
-                        _, buffer = cv2.imencode('.jpg', frame)
-                        frame_bytes = buffer.tobytes()
-
-                        # Process frame using existing detection logic
-                        results = model(frame_bytes)
-                        detections = process_detections(results[0])
-                        if detections:
-                            all_detections.extend(detections)
-
-                    frame_count += 1
-
-                cap.release()
-
-                # Create detection log
-                detection_log = DetectionLog(
-                    user_id=user_id,
-                    source_type="upload",
-                    detections=all_detections,
-                    confidence_score=max([d.confidence for d in all_detections], default=0.0),
-                    has_fire=any(d.class_name == "fire" for d in all_detections),
-                    created_at=datetime.now(pytz.UTC)
-                )
-                db.add(detection_log)
-                db.commit()
-
-                return DetectionResponse(
-                    id=detection_log.id,
-                    has_fire=detection_log.has_fire,
-                    confidence_score=detection_log.confidence_score,
-                    detections=all_detections,
-                    message="Video processing completed"
-                )
-
-            except Exception as e:
-                logger.error(f"Error processing video: {str(e)}")
-                raise HTTPException(status_code=500, detail="Error processing video")
-        finally:
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+            # Create detection log
+            detection_data = build_detection_log(
+                all_detections, "Video processing completed", file_name=video.filename
+            )
+            await save_detection_log(db, detection_data)
+            return respond(request, detection_data)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing video: {str(e)}")
+            raise HTTPException(status_code=500, detail="Error processing video")
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
 
 @router.get("/health")
 async def health_check():
     try:
         # Check if YOLO model is loaded
-        if model:
+        if registry.is_loaded("fire"):
             return {"status": "healthy", "model_loaded": True}
         return {"status": "degraded", "model_loaded": False}
     except Exception as e:
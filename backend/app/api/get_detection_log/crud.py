@@ -1,28 +1,98 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models.detection_log import DetectionLog
+from app.db.models.detection_object import DetectionObject
+from app.db.models.detection_count import DetectionCount
+import base64
 import json
-from sqlalchemy import desc
-from typing import Optional
+from datetime import datetime
+from sqlalchemy import and_, desc, or_, select
+from typing import List, Optional, Tuple
+import pytz
 
 
-def get_detection_logs(
-    db: Session, skip: int = 0, limit: int = 15, filter: Optional[str] = None
-):
-    query = db.query(DetectionLog)
+def encode_cursor(log: DetectionLog) -> str:
+    # created_at is timezone-aware UTC (UTCDateTime), so the cursor carries the offset
+    raw = f"{log.created_at.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
 
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    raises ValueError for a malformed cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, log_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at).astimezone(pytz.UTC), log_id
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor}") from e
+
+
+def keyset(created_at_column, id_column, created_at: datetime, log_id: str):
+    # keyset pagination: continue strictly after the last row of the previous page
+    return or_(
+        created_at_column < created_at,
+        and_(created_at_column == created_at, id_column < log_id),
+    )
+
+
+async def get_filtered_logs(
+    db: AsyncSession, filter: str, cursor: Optional[str], limit: int
+) -> List[DetectionLog]:
+    """
+    logs containing the class, newest first; the page is read from the
+    (class_name, created_at, log_id) index of detection_objects, in index order
+    """
+    # detection_objects의 인덱스 순서대로 읽으므로 정렬용 임시 B-tree가 필요 없음
+    query = select(DetectionObject.log_id, DetectionObject.created_at).where(
+        DetectionObject.class_name == filter
+    )
+    if cursor:
+        query = query.where(
+            keyset(DetectionObject.created_at, DetectionObject.log_id, *decode_cursor(cursor))
+        )
+    result = await db.execute(
+        query.distinct()
+        .order_by(desc(DetectionObject.created_at), desc(DetectionObject.log_id))
+        .limit(limit)
+    )
+    log_ids = [log_id for log_id, _ in result.all()]
+    if not log_ids:
+        return []
+
+    result = await db.execute(select(DetectionLog).where(DetectionLog.id.in_(log_ids)))
+    by_id = {log.id: log for log in result.scalars().all()}
+    return [by_id[log_id] for log_id in log_ids if log_id in by_id]
+
+
+async def get_detection_logs(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 15,
+    filter: Optional[str] = None,
+) -> Tuple[List[DetectionLog], Optional[str]]:
+    """
+    one page of logs, newest first, and the cursor of the next page (None on the last page)
+    """
     if filter:
-        # SQLite에서는 JSON_ARRAY_CONTAINS 같은 함수가 없으므로
-        # has_fire 컬럼을 활용하여 fire 필터링
-        if filter == "fire":
-            query = query.filter(DetectionLog.has_fire == True)
-        # 다른 클래스에 대한 필터링이 필요한 경우
-        # JSON 문자열에서 class_name을 검색
-        else:
-            query = query.filter(
-                DetectionLog.detections.like(f'%"class_name": "{filter}"%')
+        logs = await get_filtered_logs(db, filter, cursor, limit + 1)
+    else:
+        query = select(DetectionLog)
+        if cursor:
+            query = query.where(
+                keyset(DetectionLog.created_at, DetectionLog.id, *decode_cursor(cursor))
+            )
+        result = await db.execute(
+            query.order_by(desc(DetectionLog.created_at), desc(DetectionLog.id)).limit(
+                limit + 1
             )
+        )
+        logs = list(result.scalars().all())
 
-    logs = query.order_by(desc(DetectionLog.created_at)).offset(skip).limit(limit).all()
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = encode_cursor(logs[-1])
 
     # JSON 문자열을 파이썬 객체로 변환
     for log in logs:
@@ -31,8 +101,15 @@ def get_detection_logs(
                 log.detections = json.loads(log.detections)
             except json.JSONDecodeError:
                 log.detections = []
-    return logs
+    return logs, next_cursor
 
 
-def get_total_detection_logs_count(db: Session) -> int:
-    return db.query(DetectionLog).count()
+async def get_total_detection_logs_count(
+    db: AsyncSession, filter: Optional[str] = None
+) -> int:
+    # detection_counts에서 필터에 맞는 합계를 조회 (O(1))
+    key = f"class:{filter}" if filter else "all"
+    count = await db.scalar(
+        select(DetectionCount.count).where(DetectionCount.key == key)
+    )
+    return count or 0
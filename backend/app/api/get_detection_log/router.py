@@ -1,10 +1,14 @@
 from typing import Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # api의 요청 응답 구조를 정의
-from app.api.get_detection_log.schema import GetDetectionLogResponse
+from app.api.get_detection_log.schema import (
+    GetDetectionLogResponse,
+    build_detection_log_response,
+)
+from app.utils.responses import respond
 
 # 데이터베이스 연결 함수
 from app.db.database import get_db
@@ -19,16 +23,22 @@ router = APIRouter()
 
 
 @router.get("/get_detection_log", response_model=GetDetectionLogResponse)
-def get_detection_log(
-    page: Optional[int] = 0,
-    page_size: Optional[int] = 15,
+async def get_detection_log(
+    request: Request,
+    cursor: Optional[str] = None,
+    page_size: int = Query(15, ge=1, le=100),
     filter: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    items = get_detection_logs(
-        db, skip=(page - 1) * page_size, limit=page_size, filter=filter
-    )
-
-    total_count = get_total_detection_logs_count(db)
-
-    return {"items": items, "total_count": total_count}
+    # cursor는 이전 응답의 next_cursor (첫 페이지는 생략)
+    try:
+        items, next_cursor = await get_detection_logs(
+            db, cursor=cursor, limit=page_size, filter=filter
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+    total_count = await get_total_detection_logs_count(db, filter=filter)
+
+    # DB rows are already typed: built without re-validation, JSON (orjson) or msgpack by Accept
+    return respond(request, build_detection_log_response(items, total_count, next_cursor))
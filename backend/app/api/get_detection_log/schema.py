@@ -1,10 +1,45 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
-from app.api.share_schema import DetectionLog
+from app.api.share_schema import Detection
+
+
+class DetectionLogItem(BaseModel):
+    id: str
+    message: Optional[str] = None
+    has_fire: bool
+    confidence_score: Optional[float] = None
+    file_name: Optional[str] = None
+    detections: List[Detection] = []
+    result_image: Optional[str] = None
+    date: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
 
 
 class GetDetectionLogResponse(BaseModel):
-    items: List[DetectionLog]
+    items: List[DetectionLogItem]
     total_count: int
+    next_cursor: Optional[str] = None
+
 
+def build_detection_log_response(
+    logs: list, total_count: int, next_cursor: Optional[str] = None
+) -> GetDetectionLogResponse:
+    """
+    response from DetectionLog rows without re-validating them (model_construct)
+    """
+    fields = [name for name in DetectionLogItem.model_fields if name != "detections"]
+    items = [
+        DetectionLogItem.model_construct(
+            **{name: getattr(log, name) for name in fields},
+            detections=[Detection.model_construct(**d) for d in log.detections or []],
+        )
+        for log in logs
+    ]
+    return GetDetectionLogResponse.model_construct(
+        items=items, total_count=total_count, next_cursor=next_cursor
+    )
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import uuid
+import zipfile
+from typing import List, Literal, Tuple
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.api.predict_fire.crud import create_detection_logs
+from app.db.database import AsyncSessionLocal
+from app.utils.auth import get_current_user
+from app.utils.batching import INFERENCE_MAX_BATCH_SIZE, scheduler
+from app.utils.executor import executor
+from app.utils.image import decode_image
+from app.utils.model_registry import class_names
+from app.utils.postprocess import Detections, current_time
+from app.utils.render import result_image_name, schedule_result_image
+from app.utils.responses import encode
+from app.utils.result_cache import result_cache
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# batch prediction for inspection stations: many images (or one zip of images) in a single
+# request. images go through the model in batches and every image's result is streamed back
+# as one NDJSON line as soon as its batch is done (fire detection logs of the batch are
+# written in one transaction first), followed by a summary line.
+
+PREDICT_BATCH_MAX_FILES = int(os.getenv("PREDICT_BATCH_MAX_FILES", "500"))
+# total (uncompressed) image bytes per request
+PREDICT_BATCH_MAX_MB = float(os.getenv("PREDICT_BATCH_MAX_MB", "512"))
+ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png"}
+
+
+def allowed_file(filename: str) -> bool:
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def is_zip(upload: UploadFile) -> bool:
+    return (upload.filename or "").lower().endswith(".zip") or upload.content_type in (
+        "application/zip",
+        "application/x-zip-compressed",
+    )
+
+
+def read_zip(fileobj) -> List[Tuple[str, bytes]]:
+    """
+    image entries of a zip archive (other entries and macOS metadata are skipped)
+    """
+    try:
+        with zipfile.ZipFile(fileobj) as archive:
+            entries = [
+                info
+                for info in archive.infolist()
+                if not info.is_dir()
+                and allowed_file(info.filename)
+                and not info.filename.startswith("__MACOSX/")
+            ]
+            check_limits(len(entries), sum(info.file_size for info in entries))
+            return [(info.filename, archive.read(info)) for info in entries]
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=422, detail="invalid zip archive.")
+
+
+def check_limits(count: int, size: int) -> None:
+    if count > PREDICT_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413, detail=f"too many images (max {PREDICT_BATCH_MAX_FILES})."
+        )
+    if size > PREDICT_BATCH_MAX_MB * 1024 * 1024:
+        raise HTTPException(
+            status_code=413, detail=f"batch too large (max {PREDICT_BATCH_MAX_MB:g} MB)."
+        )
+
+
+def build_result(model_name: str, file_name: str, detections: Detections, result_image) -> dict:
+    """
+    one image's result, shaped like the /predict_fire or /predict_metal response
+    """
+    if model_name == "metal":
+        return {
+            "message": "Metal classification complete",
+            "file_name": file_name,
+            "detections": detections.to_list(),
+            "result_image": result_image,
+            "date": current_time(),
+        }
+
+    fire_detected = detections.has_class("fire")
+    return {
+        "id": str(uuid.uuid4()),
+        "message": "fire detected" if fire_detected else "safe",
+        "has_fire": fire_detected,
+        "confidence_score": detections.max_confidence() if fire_detected else 0.0,
+        "file_name": file_name if fire_detected else None,
+        "detections": detections.to_list(),
+        "result_image": result_image if fire_detected else None,
+        "date": current_time(),
+    }
+
+
+def error_detail(error: Exception) -> str:
+    return getattr(error, "detail", None) or "failed to process image."
+
+
+async def predict_chunk(model_name: str, names: dict, chunk: List[Tuple[str, bytes]]) -> List[dict]:
+    """
+    results for a chunk of (file name, bytes); the images share batched forward passes
+    """
+    keys = [result_cache.key(model_name, contents) for _, contents in chunk]
+    cached = await run_in_threadpool(lambda: [result_cache.get(key) for key in keys])
+    images = await executor.run(
+        lambda: [None if hit else decode_image(contents) for hit, (_, contents) in zip(cached, chunk)]
+    )
+
+    # the scheduler groups these into one batch (shared with concurrent requests)
+    pending = [img for img in images if img is not None]
+    inferred = iter(
+        await asyncio.gather(
+            *(scheduler.infer(model_name, img) for img in pending), return_exceptions=True
+        )
+    )
+
+    results = []
+    for (file_name, _), key, hit, img in zip(chunk, keys, cached, images):
+        if hit is not None:
+            detections = Detections.from_list(hit["detections"])
+            results.append(build_result(model_name, file_name, detections, hit["result_image"]))
+            continue
+        if img is None:
+            results.append({"file_name": file_name, "error": "failed to decode image."})
+            continue
+
+        result = next(inferred)
+        if isinstance(result, Exception):
+            results.append({"file_name": file_name, "error": error_detail(result)})
+            continue
+
+        detections = Detections.from_result(result, names)
+        items = detections.to_list()
+        result_image = None
+        # same rule as the single-image endpoints: fire images only when fire is found
+        if model_name == "metal" or detections.has_class("fire"):
+            result_image = result_image_name()
+            schedule_result_image(result_image, img, items, result=result)
+        await run_in_threadpool(
+            result_cache.set, key, {"detections": items, "result_image": result_image}
+        )
+        results.append(build_result(model_name, file_name, detections, result_image))
+    return results
+
+
+async def save_logs(logs: List[dict]) -> int:
+    """
+    fire detection logs of one chunk, in one transaction
+    """
+    async with AsyncSessionLocal() as db:
+        return await create_detection_logs(db, logs)
+
+
+async def stream_results(model_name: str, names: dict, inputs: List[Tuple[str, bytes]]):
+    summary = {"done": True, "count": len(inputs), "failed": 0, "logged": 0}
+    for start in range(0, len(inputs), INFERENCE_MAX_BATCH_SIZE):
+        chunk = inputs[start : start + INFERENCE_MAX_BATCH_SIZE]
+        try:
+            results = await predict_chunk(model_name, names, chunk)
+        except Exception as e:
+            # e.g. 503 from a full executor: this chunk fails, the stream goes on
+            if not isinstance(e, HTTPException):
+                logger.error(f"batch chunk failed: {str(e)}")
+            results = [
+                {"file_name": file_name, "error": error_detail(e)} for file_name, _ in chunk
+            ]
+
+        logs = [r for r in results if "error" not in r] if model_name == "fire" else []
+        if logs:
+            # saved before the lines are sent: whatever the client received is logged,
+            # even if it disconnects later
+            try:
+                # shielded: a disconnect during the write does not cancel it
+                summary["logged"] += await asyncio.shield(save_logs(logs))
+            except Exception as e:
+                logger.error(f"failed to save batch detection logs: {str(e)}")
+                summary["error"] = "failed to save detection logs."
+
+        for index, result in enumerate(results, start):
+            if "error" in result:
+                summary["failed"] += 1
+            yield encode({"index": index, **result}) + b"\n"
+
+    yield encode(summary) + b"\n"
+
+
+@router.post("/predict_batch")
+async def predict_batch(
+    files: List[UploadFile] = File(...),
+    model: Literal["fire", "metal"] = Query("fire"),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    many images (or zip archives of images) in one request; streams one NDJSON line per
+    image ({"index", ...same fields as /predict_fire or /predict_metal}) and a final
+    {"done": true, ...} summary line
+    """
+    inputs: List[Tuple[str, bytes]] = []
+    for upload in files:
+        if is_zip(upload):
+            inputs.extend(await run_in_threadpool(read_zip, upload.file))
+        elif allowed_file(upload.filename or ""):
+            inputs.append((upload.filename, await upload.read()))
+        else:
+            raise HTTPException(
+                status_code=422,
+                detail=f"unsupported file format: {upload.filename}. only jpg, jpeg, png or zip are allowed.",
+            )
+        check_limits(len(inputs), sum(len(contents) for _, contents in inputs))
+
+    if not inputs:
+        raise HTTPException(status_code=422, detail="no images in the request.")
+
+    # resolved before streaming: a failed model load is still a plain HTTP error
+    names = await class_names(model)
+    logger.info(
+        f"Batch of {len(inputs)} images ({model}) for user: {current_user['user_id']}"
+    )
+    return StreamingResponse(
+        stream_results(model, names, inputs), media_type="application/x-ndjson"
+    )
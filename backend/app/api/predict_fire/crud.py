@@ -1,9 +1,72 @@
+from collections import Counter
+from datetime import datetime
+from typing import List, Tuple, Union
+import pytz
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.db.models.detection_log import DetectionLog
+from app.db.models.detection_object import DetectionObject
+from app.db.models.detection_count import DetectionCount
 from app.models.detection import DetectionResponse
 
 
-def create_detection_log(db: Session, detection_data: dict):
+def build_detection_objects(log_id: str, created_at: datetime, detections: list) -> list:
+    return [
+        DetectionObject(
+            log_id=log_id,
+            created_at=created_at,
+            class_name=d["class_name"],
+            confidence=d["confidence"],
+            x1=d["bbox"][0],
+            y1=d["bbox"][1],
+            x2=d["bbox"][2],
+            y2=d["bbox"][3],
+        )
+        for d in detections
+    ]
+
+
+def count_keys(detections: list) -> Counter:
+    keys = Counter({"all": 1})
+    for class_name in {d["class_name"] for d in detections}:
+        keys[f"class:{class_name}"] += 1
+    return keys
+
+
+async def increment_detection_counts(db: AsyncSession, keys: Counter):
+    """
+    add to the running totals without committing (part of the caller's transaction)
+    """
+    dialect = db.get_bind().dialect.name
+    for key, amount in keys.items():
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(DetectionCount).values(key=key, count=amount)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DetectionCount.key],
+                set_={"count": DetectionCount.count + amount},
+            )
+            await db.execute(stmt)
+        else:
+            result = await db.execute(
+                update(DetectionCount)
+                .where(DetectionCount.key == key)
+                .values(count=DetectionCount.count + amount)
+            )
+            if result.rowcount == 0:
+                db.add(DetectionCount(key=key, count=amount))
+                await db.flush()
+
+
+def add_detection_log(db: Union[Session, AsyncSession], detection_data: dict) -> Tuple[DetectionLog, Counter]:
+    """
+    stage a log and its detection objects in the session (no commit);
+    returns the log and the count keys it adds to
+    """
     detections_list = [
         {
             "class_name": d["class_name"],
@@ -12,7 +75,7 @@ def create_detection_log(db: Session, detection_data: dict):
         }
         for d in detection_data["detections"]
     ]
-    
+
     db_log = DetectionLog(
         id=detection_data["id"],  # Use the string UUID
         file_name=detection_data["file_name"],
@@ -21,9 +84,31 @@ def create_detection_log(db: Session, detection_data: dict):
         message=detection_data["message"],
         has_fire=detection_data["has_fire"],
         confidence_score=detection_data["confidence_score"],
-        date=detection_data["date"]
+        date=detection_data["date"],
+        # queued (write-behind) logs carry the time the request was handled
+        created_at=detection_data.get("created_at") or datetime.now(pytz.UTC),
     )
     db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
+    db.add_all(build_detection_objects(db_log.id, db_log.created_at, detections_list))
+    return db_log, count_keys(detections_list)
+
+
+async def create_detection_log(db: AsyncSession, detection_data: dict):
+    db_log, keys = add_detection_log(db, detection_data)
+    await increment_detection_counts(db, keys)
+    await db.commit()
+    await db.refresh(db_log)
     return db_log
+
+
+async def create_detection_logs(db: AsyncSession, items: List[dict]) -> int:
+    """
+    insert many logs in one transaction
+    """
+    keys = Counter()
+    for detection_data in items:
+        _, log_keys = add_detection_log(db, detection_data)
+        keys.update(log_keys)
+    await increment_detection_counts(db, keys)
+    await db.commit()
+    return len(items)
@@ -1,19 +1,33 @@
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app.utils.auth import get_current_user
-from app.models.detection import DetectionResponse, Detection
+from app.models.detection import DetectionResponse, build_detection_response
 from datetime import datetime
-from ultralytics import YOLO
 import logging
-import shutil
-import os
 import pytz  # new import
 
-import cv2
 
-from app.api.predict_fire.crud import create_detection_log
+from app.utils.log_writer import save_detection_log
+from app.utils.model_registry import get_model_async
+from app.utils.batching import scheduler
+from app.utils.executor import executor
+from app.utils.image import decode_image
+from app.utils.postprocess import Detections
+from app.utils.render import result_image_name, schedule_result_image
+from app.utils.responses import respond
+from app.utils.result_cache import CACHE_HEADER, result_cache
+from app.utils.tiling import (
+    TILE_FULL_IMAGE,
+    TILE_MAX_COUNT,
+    TILE_MAX_OVERLAP,
+    TILE_OVERLAP,
+    TILE_SIZE,
+    sliced_predict,
+    tile_count,
+)
 
 
 router = APIRouter()
@@ -30,20 +44,17 @@ def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def generate_random_file_name(filename: str) -> str:
-    """
-    keep file extension and generate random file name
-    """
-    _, file_extension = os.path.splitext(filename)
-    random_file_name = f"{uuid.uuid4()}{file_extension}"
-    return random_file_name
-
-
 @router.post("/predict_fire", response_model=DetectionResponse)
 async def predict_fire(
+    request: Request,
     file: UploadFile = File(...),
+    # sliced inference for high-resolution images with small fires (opt-in, slower)
+    sliced: bool = Query(False),
+    tile_size: int = Query(TILE_SIZE, ge=160, le=4096),
+    tile_overlap: float = Query(TILE_OVERLAP, ge=0.0, le=TILE_MAX_OVERLAP),
+    full_image: bool = Query(TILE_FULL_IMAGE),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         # Log the authenticated user
@@ -59,88 +70,106 @@ async def predict_fire(
                 detail="unsupported file format. only jpg, jpeg or png are allowed.",
             )
 
-        # generate random file name and set temp directory
-        new_file_name = generate_random_file_name(file.filename)
-        temp_dir = "temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_file_path = os.path.join(temp_dir, new_file_name)
+        # generate random file name for the result image (extension of the output format)
+        new_file_name = result_image_name()
 
-        # save temp file
-        try:
-            with open(temp_file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-        except IOError as e:
-            logger.error(f"error occurred while saving file: {str(e)}")
-            raise HTTPException(status_code=500, detail="failed to save file.")
+        contents = await file.read()
 
-        # load model
-        try:
-            model = YOLO("app/assets/best.pt")  # relative path
-            logger.info("model loaded successfully.")
-        except Exception as e:
-            logger.error(f"error occurred while loading model: {str(e)}")
-            raise HTTPException(status_code=500, detail="failed to load model.")
+        # identical uploads (retries, static cameras) reuse the cached detections
+        params = (
+            {"tile_size": tile_size, "tile_overlap": tile_overlap, "full_image": full_image}
+            if sliced
+            else None
+        )
+        cache_key = result_cache.key("fire", contents, params)
+        cached = await run_in_threadpool(result_cache.get, cache_key)
+        cache_status = "HIT" if cached is not None else "MISS"
 
         try:
-            # run model
-            results = model(temp_file_path)
-
-            result = results[0]
-            boxes = result.boxes
-
-            # create annotated image (bounding box)
-            annotated_img = result.plot()  # or result.render()
-
-            processed_result = {"file_name": file.filename, "detections": []}
-            fire_detected = False  # track fire detection
-
-            # process results: extract class name, confidence, and coordinates for each box
-            for box in boxes:
-                class_name = model.names[int(box.cls)]
-                detection = Detection(
-                    class_name=class_name,
-                    confidence=float(box.conf),
-                    bbox=box.xyxy[0].tolist(),
+            if cached is not None:
+                detection_items = cached["detections"]
+                detections = Detections.from_list(detection_items)
+                result_file_key = cached["result_image"]
+            else:
+                # decode upload in memory (nothing is written to disk)
+                img = await executor.run(decode_image, contents)
+                if img is None:
+                    raise HTTPException(status_code=422, detail="failed to decode image.")
+
+                # load model
+                try:
+                    model = await get_model_async("fire")
+                except HTTPException:
+                    raise
+                except Exception as e:
+                    logger.error(f"error occurred while loading model: {str(e)}")
+                    raise HTTPException(status_code=500, detail="failed to load model.")
+
+                if sliced:
+                    count = tile_count(*img.shape[:2], tile_size, tile_overlap)
+                    if count > TILE_MAX_COUNT:
+                        raise HTTPException(
+                            status_code=422,
+                            detail=f"too many tiles ({count}, max {TILE_MAX_COUNT}): "
+                            "use a larger tile_size or a smaller tile_overlap.",
+                        )
+                    # overlapping tiles run as one batch, boxes merged with cross-tile NMS
+                    boxes = await executor.run(
+                        sliced_predict, model, img, tile_size, tile_overlap, full_image
+                    )
+                    # no ultralytics result to plot: the image is rendered with draw_boxes
+                    result = None
+                    detections = Detections.from_array(boxes, model.names)
+                else:
+                    # run model (batched with concurrent requests)
+                    result = await scheduler.infer("fire", img)
+
+                    # process results: class names, confidences and boxes in one transfer
+                    detections = Detections.from_result(result, model.names)
+
+                # serialized once, shared by the image, the cache, the response and the log
+                detection_items = detections.to_list()
+
+                result_file_key = None
+                if detections.has_class("fire"):
+                    # save result image when fire is detected; it is rendered and stored
+                    # (local disk or S3, see STORAGE_BACKEND) after the response is sent
+                    schedule_result_image(
+                        new_file_name,
+                        img,
+                        detection_items,
+                        result=result,
+                    )
+                    result_file_key = new_file_name
+
+                await run_in_threadpool(
+                    result_cache.set,
+                    cache_key,
+                    {
+                        "detections": detection_items,
+                        "result_image": result_file_key,
+                    },
                 )
-                processed_result["detections"].append(detection)
 
-                if class_name == "fire":
-                    fire_detected = True
+            fire_detected = detections.has_class("fire")
 
             # set current time (UTC -> Asia/Seoul)
             utc_now = datetime.now(pytz.UTC)
             korea_timezone = pytz.timezone("Asia/Seoul")
             current_time = utc_now.astimezone(korea_timezone).strftime("%Y-%m-%d %H:%M:%S")
 
-            # create log directory
-            log_dir = "log"
-            os.makedirs(log_dir, exist_ok=True)
-
             if fire_detected:
-                # save result image when fire is detected
-                log_file_path = os.path.join(log_dir, new_file_name)
-                cv2.imwrite(log_file_path, annotated_img)
-
-                # upload to S3 or other external storage and get file key (later)
-                # result_file_key = uploadImageToAWS.usingFilePath(log_file_path)
-                result_file_key = new_file_name  # temporary value
-
-                resResult = DetectionResponse(
+                # typed from model output already: built without re-validation
+                resResult = build_detection_response(dict(
                     id=str(uuid.uuid4()),  # Explicitly convert UUID to string
-                    message="fire detected" if fire_detected else "safe",
-                    has_fire=fire_detected,
-                    confidence_score=float(result.boxes[0].conf[0]) if fire_detected else 0.0,
-                    file_name=file.filename if fire_detected else None,
-                    detections=[
-                        Detection(
-                            class_name=d.class_name,
-                            confidence=d.confidence,
-                            bbox=d.bbox
-                        ) for d in processed_result["detections"]
-                    ],
-                    result_image=result_file_key if fire_detected else None,
+                    message="fire detected",
+                    has_fire=True,
+                    confidence_score=detections.max_confidence(),
+                    file_name=file.filename,
+                    detections=detection_items,
+                    result_image=result_file_key,
                     date=current_time
-                )
+                ))
 
                 # delete result image (later)
                 # if os.path.exists(log_file_path):
@@ -150,23 +179,26 @@ async def predict_fire(
                 #     except Exception as e:
                 #         logger.error(f"Failed to delete result file: {str(e)}")
             else:
-                resResult = DetectionResponse(
+                resResult = build_detection_response(dict(
                     id=str(uuid.uuid4()),  # Explicitly convert UUID to string
                     message="safe",
                     has_fire=False,
                     confidence_score=0.0,
                     file_name=None,
-                    detections=processed_result["detections"],
+                    detections=detection_items,
                     result_image=None,
                     date=current_time
-                )
+                ))
 
             # save detection log
-            create_detection_log(db=db, detection_data=resResult.model_dump())
+            await save_detection_log(db, resResult.model_dump())
 
             logger.info(f"Response result: {resResult}")
-            return resResult
+            # orjson (or msgpack by Accept), without a second response_model pass
+            return respond(request, resResult, headers={CACHE_HEADER: cache_status})
 
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"error occurred while processing image: {str(e)}")
             raise HTTPException(status_code=500, detail="failed to process image.")
@@ -177,13 +209,3 @@ async def predict_fire(
     except Exception as e:
         logger.error(f"Error in predict_fire: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-
-    finally:
-        logger.info("Cleaning up temporary files.")
-        # delete temp file (later)
-        # if os.path.exists(temp_file_path):
-        #     try:
-        #         os.remove(temp_file_path)
-        #         logger.info(f"Successfully deleted temp file: {temp_file_path}")
-        #     except Exception as e:
-        #         logger.error(f"Failed to delete temp file: {str(e)}")
@@ -0,0 +1,22 @@
+import mimetypes
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+
+from app.utils.executor import executor
+from app.utils.render import load_result_image
+
+router = APIRouter()
+
+
+@router.get("/result_image/{name:path}")
+async def get_result_image(name: str):
+    # name is the result_image key (e.g. "3f/a2/<uuid>.jpg"); stored boxes are not served
+    if name.endswith(".json"):
+        raise HTTPException(status_code=404, detail="result image not found")
+
+    content = await executor.run(load_result_image, name)
+    if content is None:
+        raise HTTPException(status_code=404, detail="result image not found")
+
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return Response(content=content, media_type=media_type)
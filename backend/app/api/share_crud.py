@@ -1,16 +1,19 @@
-from sqlalchemy.orm import Session, load_only
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from app.db.models.user import User as user_model
 
 
 # common crud
-def get_user_by_email(db: Session, email: str):
-    return (
-        db.query(user_model)
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(
+        select(user_model)
         .options(
             load_only(
                 user_model.email,
             )
         )
-        .filter(user_model.email == email)
-        .first()
+        .where(user_model.email == email)
+        .limit(1)
     )
+    return result.scalars().first()
@@ -0,0 +1,50 @@
+from typing import List, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.models.video_job_detection import VideoJobDetection
+
+
+def add_job_detections(db: Union[Session, AsyncSession], job_id: str, detections: List[dict]) -> None:
+    """
+    stage detection rows ({class_name, confidence, bbox, frame}) of a job (no commit)
+    """
+    db.add_all(
+        VideoJobDetection(
+            job_id=job_id,
+            frame=d["frame"],
+            class_name=d["class_name"],
+            confidence=d["confidence"],
+            x1=d["bbox"][0],
+            y1=d["bbox"][1],
+            x2=d["bbox"][2],
+            y2=d["bbox"][3],
+        )
+        for d in detections
+    )
+
+
+async def get_job_detections(db: AsyncSession, job_id: str, offset: int = 0) -> List[dict]:
+    """
+    detections of a job in the order they were found, from offset on
+    """
+    result = await db.execute(
+        select(
+            VideoJobDetection.frame,
+            VideoJobDetection.class_name,
+            VideoJobDetection.confidence,
+            VideoJobDetection.x1,
+            VideoJobDetection.y1,
+            VideoJobDetection.x2,
+            VideoJobDetection.y2,
+        )
+        .where(VideoJobDetection.job_id == job_id)
+        .order_by(VideoJobDetection.id)
+        .offset(offset)
+    )
+    return [
+        {"class_name": class_name, "confidence": confidence, "bbox": [x1, y1, x2, y2], "frame": frame}
+        for frame, class_name, confidence, x1, y1, x2, y2 in result.all()
+    ]
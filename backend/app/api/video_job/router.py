@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import uuid
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.video_job.crud import get_job_detections
+from app.api.video_job.schema import VideoJobDetectionsResponse, VideoJobResponse
+from app.db.database import AsyncSessionLocal, get_db
+from app.db.models.video_job import JOB_DONE, JOB_FAILED, JOB_QUEUED, VideoJob
+from app.utils import storage
+from app.utils.auth import get_current_user
+from app.utils.responses import encode
+from app.utils.video_jobs import lease_expiry, video_jobs
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# job API for long videos: POST returns a job id right away, worker processes analyze the
+# video, clients poll GET /video_jobs/{id} or follow GET /video_jobs/{id}/stream
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# how often /stream re-reads the job row
+VIDEO_JOB_POLL_INTERVAL = float(os.getenv("VIDEO_JOB_POLL_INTERVAL", "1"))
+
+
+def job_summary(job: VideoJob) -> dict:
+    progress = None
+    if job.status == JOB_DONE:
+        progress = 1.0
+    elif job.total_frames:
+        progress = min(job.processed_frames / job.total_frames, 1.0)
+    return {
+        "id": job.id,
+        "status": job.status,
+        "file_name": job.file_name,
+        "frame_stride": job.frame_stride,
+        "processed_frames": job.processed_frames,
+        "total_frames": job.total_frames,
+        "progress": progress,
+        "detection_count": job.detection_count or 0,
+        "log_id": job.log_id,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+async def get_user_job(db: AsyncSession, job_id: str, current_user: dict) -> VideoJob:
+    job = await db.get(VideoJob, job_id)
+    # other users' jobs are reported as missing
+    if job is None or job.user_id != current_user["user_id"]:
+        raise HTTPException(status_code=404, detail="video job not found")
+    return job
+
+
+@router.post("/video_jobs", response_model=VideoJobResponse, status_code=202)
+async def create_video_job(
+    video: UploadFile = File(...),
+    frame_stride: int = Query(30, ge=1, description="analyze every n-th frame"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if not video.content_type or not video.content_type.startswith("video/"):
+        raise HTTPException(status_code=400, detail="File must be a video")
+    if not video_jobs.running:
+        raise HTTPException(status_code=503, detail="video jobs are not available")
+
+    job_id = str(uuid.uuid4())
+    _, suffix = os.path.splitext(video.filename or "")
+    # kept in JOB_DIR (not temp/) so the job can resume after a restart
+    video_path = os.path.join(storage.JOB_DIR, f"{job_id}{suffix or '.mp4'}")
+    try:
+        with open(video_path, "wb") as f:
+            while chunk := await video.read(UPLOAD_CHUNK_SIZE):
+                await run_in_threadpool(f.write, chunk)
+
+        job = VideoJob(
+            id=job_id,
+            user_id=current_user["user_id"],
+            status=JOB_QUEUED,
+            file_name=video.filename,
+            video_path=video_path,
+            frame_stride=frame_stride,
+            detection_count=0,
+            # created already claimed by this process, siblings leave it alone
+            owner=video_jobs.owner,
+            lease_until=lease_expiry(),
+        )
+        db.add(job)
+        await db.commit()
+    except Exception:
+        if os.path.exists(video_path):
+            os.remove(video_path)
+        raise
+
+    try:
+        video_jobs.submit(job_id)
+    except Exception as e:
+        # the job is saved: it is claimed again once its lease runs out
+        logger.error(f"failed to start video job {job_id}: {str(e)}")
+    logger.info(f"video job {job_id} queued for user: {current_user['user_id']}")
+    return job_summary(job)
+
+
+@router.get("/video_jobs/{job_id}", response_model=VideoJobResponse)
+async def get_video_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return job_summary(await get_user_job(db, job_id, current_user))
+
+
+@router.get("/video_jobs/{job_id}/detections", response_model=VideoJobDetectionsResponse)
+async def get_video_job_detections(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    detections found so far (partial while the job is running), from offset on
+    """
+    job = await get_user_job(db, job_id, current_user)
+    detections = await get_job_detections(db, job_id, offset)
+    return {
+        "status": job.status,
+        "detections": detections,
+        "next_offset": offset + len(detections),
+    }
+
+
+@router.get("/video_jobs/{job_id}/stream")
+async def stream_video_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    NDJSON: one line whenever the job makes progress (with the detections found since the
+    previous line), until the job is done or failed
+    """
+    await get_user_job(db, job_id, current_user)
+
+    async def follow():
+        sent = 0
+        last = None
+        while True:
+            # a fresh session per poll: the worker process commits the progress
+            async with AsyncSessionLocal() as poll_db:
+                job = await poll_db.get(VideoJob, job_id)
+                if job is None:
+                    return
+                detections = []
+                if (job.detection_count or 0) > sent:
+                    detections = await get_job_detections(poll_db, job_id, sent)
+            summary = job_summary(job)
+            state = (job.status, job.processed_frames, len(detections))
+            if state != last:
+                yield encode({**summary, "detections": detections}) + b"\n"
+                sent += len(detections)
+                last = (job.status, job.processed_frames, 0)
+            if job.status in (JOB_DONE, JOB_FAILED):
+                return
+            await asyncio.sleep(VIDEO_JOB_POLL_INTERVAL)
+
+    return StreamingResponse(follow(), media_type="application/x-ndjson")
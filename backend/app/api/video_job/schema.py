@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+from app.api.share_schema import Detection
+
+
+class VideoJobDetection(Detection):
+    frame: int
+
+
+class VideoJobResponse(BaseModel):
+    id: str
+    status: str  # queued | running | done | failed
+    file_name: Optional[str] = None
+    frame_stride: int
+    processed_frames: int
+    total_frames: Optional[int] = None
+    progress: Optional[float] = None  # 0..1, None while the frame count is unknown
+    detection_count: int
+    log_id: Optional[str] = None  # detection log of the finished job
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class VideoJobDetectionsResponse(BaseModel):
+    status: str
+    detections: List[VideoJobDetection]
+    next_offset: int  # pass as offset to get only detections found since this call
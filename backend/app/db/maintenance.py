@@ -0,0 +1,286 @@
+import argparse
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytz
+from sqlalchemy import func, inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from app.db.database import BASE_DIR, Base, SessionLocal, engine
+from app.db.models.detection_log import DetectionLog
+from app.db.models.detection_object import DetectionObject
+from app.db.models.detection_count import DetectionCount
+from app.db.models.video_job import VideoJob
+from app.api.predict_fire.crud import build_detection_objects
+from app.api.video_job.crud import add_job_detections
+
+# maintenance commands, run from the backend directory:
+#   python -m app.db.maintenance backfill-objects  (also run at startup)
+#   python -m app.db.maintenance rebuild-counts  (with the API and workers stopped)
+#   python -m app.db.maintenance migrate-created-at  (also run at startup)
+#   python -m app.db.maintenance migrate-video-jobs  (also run at startup)
+#   python -m app.db.maintenance migrate-detection-objects  (also run at startup)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+SEOUL = pytz.timezone("Asia/Seoul")
+# held while the startup migrations run, so sibling workers (uvicorn --workers) wait for
+# the first one instead of backfilling the same rows twice
+MIGRATION_LOCK_FILE = os.getenv("MIGRATION_LOCK_FILE", os.path.join(BASE_DIR, ".migrate.lock"))
+
+
+@contextmanager
+def migration_lock():
+    with open(MIGRATION_LOCK_FILE, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def backfill_detection_objects() -> int:
+    """
+    create detection_objects rows for logs written before the table existed
+    """
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    created = 0
+    try:
+        has_objects = db.query(DetectionObject.log_id).distinct()
+        query = (
+            db.query(DetectionLog.id, DetectionLog.created_at, DetectionLog.detections)
+            .filter(DetectionLog.id.notin_(has_objects))
+            .order_by(DetectionLog.id)
+        )
+        last_id = ""
+        while True:
+            rows = query.filter(DetectionLog.id > last_id).limit(BATCH_SIZE).all()
+            if not rows:
+                break
+            for log_id, created_at, detections in rows:
+                if isinstance(detections, str):
+                    detections = json.loads(detections)
+                objects = build_detection_objects(log_id, created_at, detections or [])
+                db.add_all(objects)
+                created += len(objects)
+            db.commit()
+            last_id = rows[-1][0]
+    finally:
+        db.close()
+
+    if created:
+        logger.info(f"detection objects created: {created}")
+    return created
+
+
+def rebuild_detection_counts() -> dict:
+    """
+    recompute detection_counts from the logs (fixes drift, e.g. after manual deletes).
+    logs inserted while this runs can be counted twice or not at all, so run it with the
+    API and workers stopped; at startup it runs before anything writes logs
+    """
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        counts = {"all": db.query(func.count(DetectionLog.id)).scalar()}
+        per_class = db.query(
+            DetectionObject.class_name, func.count(func.distinct(DetectionObject.log_id))
+        ).group_by(DetectionObject.class_name)
+        for class_name, count in per_class:
+            counts[f"class:{class_name}"] = count
+
+        # replace all totals in one transaction
+        db.query(DetectionCount).delete()
+        db.add_all(DetectionCount(key=key, count=count) for key, count in counts.items())
+        db.commit()
+    finally:
+        db.close()
+
+    logger.info(f"detection counts rebuilt: {counts}")
+    return counts
+
+
+def seed_detection_counts() -> bool:
+    """
+    fill detection_counts on databases that have logs from before the table existed
+    (create_all adds it empty); a no-op once any total exists
+    """
+    db = SessionLocal()
+    try:
+        seeded = db.query(DetectionCount.key).first() is not None
+        has_logs = db.query(DetectionLog.id).first() is not None
+    finally:
+        db.close()
+    if seeded or not has_logs:
+        return False
+    rebuild_detection_counts()
+    return True
+
+
+def parse_log_date(date: str) -> datetime:
+    """
+    display date of a log (Asia/Seoul, "%Y-%m-%d %H:%M:%S") as UTC; epoch if unparseable
+    """
+    try:
+        local = SEOUL.localize(datetime.strptime(date, "%Y-%m-%d %H:%M:%S"))
+    except (TypeError, ValueError):
+        return datetime(1970, 1, 1, tzinfo=pytz.UTC)
+    return local.astimezone(pytz.UTC)
+
+
+def table_columns(table: str) -> set:
+    return {c["name"] for c in inspect(engine).get_columns(table)}
+
+
+def add_column(column) -> bool:
+    """
+    ALTER TABLE ... ADD COLUMN for a model column missing from an existing table; added
+    nullable (existing rows have no value yet, new rows get the model default)
+    """
+    table = column.table.name
+    if column.name in table_columns(table):
+        return False
+    column_type = column.type.compile(dialect=engine.dialect)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type}"))
+    except DBAPIError:
+        # another worker starting at the same time added it first
+        if column.name not in table_columns(table):
+            raise
+        return False
+    logger.info(f"{table}.{column.name} added")
+    return True
+
+
+def migrate_created_at() -> int:
+    """
+    add detection_logs.created_at to databases created before the column existed
+    (create_all does not alter tables), backfill it from the display date and create the
+    (created_at, id) pagination index; a no-op once done
+    """
+    add_column(DetectionLog.__table__.c.created_at)
+
+    db = SessionLocal()
+    updated = 0
+    try:
+        query = (
+            db.query(DetectionLog.id, DetectionLog.date)
+            .filter(DetectionLog.created_at.is_(None))
+            .order_by(DetectionLog.id)
+        )
+        while True:
+            rows = query.limit(BATCH_SIZE).all()
+            if not rows:
+                break
+            db.bulk_update_mappings(
+                DetectionLog,
+                [{"id": log_id, "created_at": parse_log_date(date)} for log_id, date in rows],
+            )
+            db.commit()
+            updated += len(rows)
+    finally:
+        db.close()
+
+    for index in DetectionLog.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+    if updated:
+        logger.info(f"detection_logs.created_at backfilled: {updated}")
+    return updated
+
+
+def migrate_detection_objects() -> int:
+    """
+    add detection_objects.created_at (copied from the log) to tables created before it and
+    swap the (class_name, log_id) index for (class_name, created_at, log_id); a no-op once
+    done. run after migrate_created_at, before backfill_detection_objects
+    """
+    Base.metadata.create_all(bind=engine)
+    add_column(DetectionObject.__table__.c.created_at)
+
+    with engine.begin() as conn:
+        updated = conn.execute(
+            text(
+                "UPDATE detection_objects SET created_at = (SELECT created_at FROM "
+                "detection_logs WHERE detection_logs.id = detection_objects.log_id) "
+                "WHERE created_at IS NULL"
+            )
+        ).rowcount
+
+    for index in DetectionObject.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    indexes = {i["name"] for i in inspect(engine).get_indexes(DetectionObject.__tablename__)}
+    if "ix_detection_objects_class_name_log_id" in indexes:
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_detection_objects_class_name_log_id"))
+
+    if updated:
+        logger.info(f"detection_objects.created_at backfilled: {updated}")
+    return updated
+
+
+def migrate_video_jobs() -> int:
+    """
+    add the job ownership / detection count columns to video_jobs tables created before
+    them, and move partial detections of unfinished jobs from the old JSON column into
+    video_job_detections; a no-op once done
+    """
+    Base.metadata.create_all(bind=engine)
+    columns = VideoJob.__table__.c
+    for column in (columns.detection_count, columns.owner, columns.lease_until):
+        add_column(column)
+
+    legacy = "detections" in table_columns(VideoJob.__tablename__)
+    db = SessionLocal()
+    migrated = 0
+    try:
+        rows = db.execute(
+            text(
+                f"SELECT id{', detections' if legacy else ''} FROM video_jobs "
+                "WHERE detection_count IS NULL"
+            )
+        ).all()
+        for row in rows:
+            detections = row[1] if legacy else None
+            if isinstance(detections, str):
+                detections = json.loads(detections)
+            add_job_detections(db, row[0], detections or [])
+            db.query(VideoJob).filter(VideoJob.id == row[0]).update(
+                {"detection_count": len(detections or [])}
+            )
+            db.commit()
+            migrated += 1
+    finally:
+        db.close()
+
+    if migrated:
+        logger.info(f"video jobs migrated: {migrated}")
+    return migrated
+
+
+COMMANDS = {
+    "backfill-objects": backfill_detection_objects,
+    "rebuild-counts": rebuild_detection_counts,
+    "migrate-created-at": migrate_created_at,
+    "migrate-video-jobs": migrate_video_jobs,
+    "migrate-detection-objects": migrate_detection_objects,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="database maintenance")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+from app.db.database import Base
+
+# running totals of detection logs, updated in the same transaction as each insert.
+# keys: "all" and "class:<class_name>" (logs containing that class)
+
+class DetectionCount(Base):
+    __tablename__ = "detection_counts"
+
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
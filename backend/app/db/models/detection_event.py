@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, Integer, Float, JSON, DateTime, Index
+from app.db.database import Base
+
+# one row per tracked object on a camera stream (see utils/tracking.py): written when the
+# event opens and updated once when it closes, instead of a detection log per frame.
+
+# open -> closed; events still open when the server stopped are marked interrupted
+EVENT_OPEN = "open"
+EVENT_CLOSED = "closed"
+EVENT_INTERRUPTED = "interrupted"
+
+
+class DetectionEvent(Base):
+    __tablename__ = "detection_events"
+
+    id = Column(String, primary_key=True)
+    camera_id = Column(String, nullable=False)
+    user_id = Column(String, nullable=True)
+    class_name = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=EVENT_OPEN)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    ended_at = Column(DateTime(timezone=True), nullable=True)  # last frame the object was seen
+    peak_confidence = Column(Float, nullable=False)
+    frame_count = Column(Integer, nullable=False, default=1)  # frames the object was seen in
+    bbox = Column(JSON)  # box of the peak-confidence frame
+    result_image = Column(String, nullable=True)  # representative (peak) frame
+    log_id = Column(String, nullable=True)  # detection log written when the event closed
+
+    __table_args__ = (
+        Index("ix_detection_events_camera_started", "camera_id", "started_at"),
+        Index("ix_detection_events_status", "status"),
+    )
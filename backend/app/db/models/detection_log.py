@@ -1,5 +1,8 @@
-from sqlalchemy import Column, String, Boolean, Float, JSON, DateTime
+from sqlalchemy import Column, String, Boolean, Float, JSON, Index
+from datetime import datetime
+import pytz
 from app.db.database import Base
+from app.db.types import UTCDateTime
 
 class DetectionLog(Base):
     __tablename__ = "detection_logs"
@@ -11,4 +14,14 @@ class DetectionLog(Base):
     file_name = Column(String, nullable=True)
     detections = Column(JSON)
     result_image = Column(String, nullable=True)
-    date = Column(String)
+    date = Column(String)  # display time (Asia/Seoul), not used for ordering
+    created_at = Column(
+        UTCDateTime,
+        nullable=False,
+        default=lambda: datetime.now(pytz.UTC),
+    )
+
+    # keyset pagination walks (created_at, id) newest first
+    __table_args__ = (
+        Index("ix_detection_logs_created_at_id", "created_at", "id"),
+    )
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
+from app.db.database import Base
+from app.db.types import UTCDateTime
+
+# one row per detected box, so class filters can use an index instead of the JSON column
+
+class DetectionObject(Base):
+    __tablename__ = "detection_objects"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    log_id = Column(
+        String, ForeignKey("detection_logs.id", ondelete="CASCADE"), nullable=False
+    )
+    class_name = Column(String, nullable=False)
+    confidence = Column(Float)
+    # bbox (xyxy)
+    x1 = Column(Float)
+    y1 = Column(Float)
+    x2 = Column(Float)
+    y2 = Column(Float)
+    # copy of the log's created_at, so a class filter pages through this table's index
+    created_at = Column(UTCDateTime, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_detection_objects_class_name_created_at",
+            "class_name",
+            "created_at",
+            "log_id",
+        ),
+        Index("ix_detection_objects_log_id", "log_id"),
+    )
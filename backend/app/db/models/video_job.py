@@ -0,0 +1,43 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index
+from datetime import datetime
+import pytz
+from app.db.database import Base
+
+# background video analysis jobs (POST /video_jobs). progress and partial detections
+# (video_job_detections) are checkpointed by the worker process, so a restart resumes a job
+# instead of starting over.
+
+# queued -> running -> done | failed
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+def utc_now():
+    return datetime.now(pytz.UTC)
+
+
+class VideoJob(Base):
+    __tablename__ = "video_jobs"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=True)
+    status = Column(String, nullable=False, default=JOB_QUEUED)
+    file_name = Column(String, nullable=True)
+    video_path = Column(String, nullable=False)  # removed when the job finishes
+    frame_stride = Column(Integer, nullable=False, default=30)
+    total_frames = Column(Integer, nullable=True)  # container estimate, may be 0
+    processed_frames = Column(Integer, nullable=False, default=0)  # resume position
+    detection_count = Column(Integer, default=0)  # rows in video_job_detections
+    log_id = Column(String, nullable=True)  # detection log written when done
+    error = Column(String, nullable=True)
+    # runner (API process) that runs the job and until when it holds it; the owner renews
+    # the lease while the job runs, an expired lease lets any runner claim the job
+    owner = Column(String, nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now, onupdate=utc_now)
+
+    # runners look up unfinished jobs by status
+    __table_args__ = (Index("ix_video_jobs_status", "status"),)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
+from app.db.database import Base
+
+# partial results of a video job, one row per detected box: a checkpoint inserts only the
+# boxes found since the previous one instead of rewriting the whole list
+
+class VideoJobDetection(Base):
+    __tablename__ = "video_job_detections"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)  # insertion (frame) order
+    job_id = Column(
+        String, ForeignKey("video_jobs.id", ondelete="CASCADE"), nullable=False
+    )
+    frame = Column(Integer, nullable=False)
+    class_name = Column(String, nullable=False)
+    confidence = Column(Float)
+    # bbox (xyxy)
+    x1 = Column(Float)
+    y1 = Column(Float)
+    x2 = Column(Float)
+    y2 = Column(Float)
+
+    # detections of a job in order, from an offset
+    __table_args__ = (Index("ix_video_job_detections_job_id_id", "job_id", "id"),)
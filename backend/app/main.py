@@ -21,10 +21,11 @@ from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.db.models import user as user_model
 from app.schemas import user as user_schema
-from app.utils.auth import get_current_user  # Only import what's in auth.py
+from app.utils.auth import get_current_user, start_jwks_refresh  # Only import what's in auth.py
 from app.utils.password import hash_password, verify_password  # Correct function name is hash_password
 from app.utils.jwt import create_access_token  # Import from jwt.py
 from datetime import timedelta
+import asyncio
 import sys
 import os
 
@@ -33,17 +34,48 @@ from app.api.create_user.router import router as create_user_router
 from app.api.get_test.router import router as get_test_router
 
 from app.db.database import engine, Base
+from app.db.maintenance import (
+    backfill_detection_objects,
+    migrate_created_at,
+    migrate_detection_objects,
+    migrate_video_jobs,
+    migration_lock,
+    seed_detection_counts,
+)
 from app.db.models import (
     user as user_model,
     session as session_model,
     detection_log as detection_log_model,
+    detection_object as detection_object_model,
+    detection_count as detection_count_model,
+    video_job as video_job_model,
+    video_job_detection as video_job_detection_model,
+    detection_event as detection_event_model,
 )
 
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
+from app.utils.model_registry import load_models, registry
+from app.utils.batching import scheduler
+from app.utils.executor import executor
+from app.utils.log_writer import DETECTION_LOG_WRITE_BEHIND, log_writer
+from app.utils import render, storage
+from app.utils.video_jobs import video_jobs
+from app.utils.tracking import close_tracks, event_tracker, run_event_sweep
+from app.api.detection.crud import interrupt_open_events
+from app.db.database import AsyncSessionLocal
 
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    with migration_lock():
+        Base.metadata.create_all(bind=engine)
+        # columns added to existing tables (create_all only creates missing tables)
+        migrate_created_at()
+        migrate_video_jobs()
+        migrate_detection_objects()
+        # class filters read detection_objects; fill it for logs written before it existed
+        backfill_detection_objects()
+        # totals of logs written before detection_counts existed (needs detection_objects)
+        seed_detection_counts()
 
 
 from contextlib import asynccontextmanager
@@ -52,10 +84,38 @@ from contextlib import asynccontextmanager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    # remove temp files left behind by requests of a previous run; only old ones, since
+    # sibling workers (uvicorn --workers) may be writing uploads to temp/ right now
+    storage.ensure_dirs()
+    storage.cleanup_temp(storage.TEMP_MAX_AGE_HOURS * 3600)
+    storage_sweep = asyncio.create_task(storage.run_retention_sweep())
+    # load and warm up models before the app starts accepting requests
+    load_models()
+    jwks_refresh = await start_jwks_refresh()
+    if DETECTION_LOG_WRITE_BEHIND:
+        await log_writer.start()
+    # video job workers; resumes jobs left unfinished by a previous run
+    await video_jobs.start()
+    # camera events left open by a previous run; then close events of idle cameras
+    async with AsyncSessionLocal() as db:
+        await interrupt_open_events(db)
+    event_sweep = asyncio.create_task(run_event_sweep())
     yield
-
-
-app = FastAPI(lifespan=lifespan)
+    await video_jobs.stop()
+    event_sweep.cancel()
+    await close_tracks(event_tracker.close_all())
+    jwks_refresh.cancel()
+    storage_sweep.cancel()
+    # drain queued detection logs before shutting down
+    await log_writer.stop()
+    await scheduler.stop()
+    executor.shutdown()
+    render.shutdown()
+    registry.clear()
+
+
+# orjson for every JSON response; detection/log endpoints also accept msgpack (utils/responses.py)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Configure CORS - allow both localhost and 127.0.0.1
 app.add_middleware(
@@ -84,7 +144,7 @@ from starlette.responses import Response
 @app.get("/health")
 async def health_check():
     return JSONResponse(
-        content={"status": "ok"},
+        content={"status": "ok", "models": registry.loaded()},
         headers={
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Methods": "GET, OPTIONS",
@@ -109,11 +169,9 @@ for api in api_dir.iterdir():
             print(f"⚠️ {router_module} not found (router.py is missing)")
 
 
-# serve log folder as static files
-log_directory = os.path.join(os.path.dirname(__file__), "log")
-
-# log the output of the server
-if not os.path.exists(log_directory):
-    os.makedirs(log_directory)
+# serve log folder (result images, sharded as log/ab/cd/<name>) as static files, images only
+# (box sidecars are not served);
+# with STORAGE_BACKEND=s3 images are served by /result_image/{key} instead
+storage.ensure_dirs()
 
-app.mount("/log", StaticFiles(directory=log_directory), name="log")
+app.mount("/log", storage.ImageFiles(directory=storage.LOG_DIR), name="log")
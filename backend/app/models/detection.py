@@ -16,3 +16,26 @@ class DetectionResponse(BaseModel):
     detections: List[Detection] = []  # Use the Detection model instead of dict
     result_image: Optional[str] = None
     date: str 
+
+
+class DetectionEvents(BaseModel):
+    opened: List[str] = []  # ids of detection events that started with this frame
+    closed: List[str] = []
+
+
+class StreamDetectionResponse(DetectionResponse):
+    camera_id: str
+    analyzed: bool = True  # False: unchanged scene, detections of the last analyzed frame
+    events: DetectionEvents
+
+
+def build_detection_response(data: dict) -> DetectionResponse:
+    """
+    DetectionResponse from trusted data (model output, stored logs) without re-validation
+    """
+    return DetectionResponse.model_construct(
+        **{
+            **data,
+            "detections": [Detection.model_construct(**d) for d in data.get("detections", [])],
+        }
+    )
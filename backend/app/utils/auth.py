@@ -1,13 +1,18 @@
-from fastapi import Depends, HTTPException, Header, Request
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from typing import Optional
+from fastapi import HTTPException, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
 import os
+import threading
+import time
 from dotenv import load_dotenv
 import requests
 import logging
 import jwt
-from jwt import PyJWKClient
+from jwt import PyJWKSet
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -17,15 +22,172 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 CLERK_SECRET_KEY = os.getenv('CLERK_SECRET_KEY', 'sk_test_iNAoYJBMRBwqFccOEofZgobWLSpVwxpeIqIV7gLyl9')
-CLERK_JWKS_URL = "https://liberal-clam-30.clerk.accounts.dev/.well-known/jwks.json"
+CLERK_ISSUER = os.getenv("CLERK_ISSUER", "https://liberal-clam-30.clerk.accounts.dev")
+CLERK_JWKS_URL = os.getenv("CLERK_JWKS_URL", f"{CLERK_ISSUER}/.well-known/jwks.json")
+# local JWKS file; when set, keys are read from it instead of CLERK_JWKS_URL (offline / tests)
+CLERK_JWKS_PATH = os.getenv("CLERK_JWKS_PATH")
+JWKS_REFRESH_INTERVAL = int(os.getenv("JWKS_REFRESH_INTERVAL", "3600"))
+# an unknown kid triggers an early refresh, but not more often than this
+JWKS_MIN_REFRESH_INTERVAL = int(os.getenv("JWKS_MIN_REFRESH_INTERVAL", "30"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class JWKSCache:
+    """
+    signing keys by kid. keys are refreshed in the background, never on the request path.
+    """
+
+    def __init__(self, url: str, path: Optional[str] = None):
+        self.url = url
+        self.path = path
+        self._keys: Dict[str, object] = {}
+        self._stale = False
+        self._refreshed_at = 0.0
+
+    def refresh(self) -> None:
+        if self.path:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        else:
+            response = requests.get(self.url, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+
+        keys = {}
+        for jwk in PyJWKSet.from_dict(data).keys:
+            keys[jwk.key_id] = jwk.key
+        self._keys = keys
+        self._stale = False
+        self._refreshed_at = time.monotonic()
+        logger.info(f"JWKS refreshed: {len(keys)} keys")
+
+    def get_signing_key(self, token: str):
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._keys.get(kid)
+        if key is None:
+            # let the background task pick up rotated keys
+            self._stale = True
+            raise jwt.InvalidTokenError(f"Unknown signing key: {kid}")
+        return key
+
+    def due(self) -> bool:
+        age = time.monotonic() - self._refreshed_at
+        if self._stale:
+            return age >= JWKS_MIN_REFRESH_INTERVAL
+        return age >= JWKS_REFRESH_INTERVAL
+
+    async def run(self) -> None:
+        """
+        background refresh loop (started from the FastAPI lifespan)
+        """
+        while True:
+            await asyncio.sleep(min(JWKS_MIN_REFRESH_INTERVAL, JWKS_REFRESH_INTERVAL))
+            if not self.due():
+                continue
+            try:
+                await run_in_threadpool(self.refresh)
+            except Exception as e:
+                # keep serving with the keys we have
+                logger.error(f"JWKS refresh failed: {str(e)}")
+
+
+class TokenCache:
+    """
+    verified user data by token hash, kept until the token expires
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self.key(token)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            user_data, expires_at = item
+            if expires_at <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return user_data
+
+    def set(self, token: str, user_data: dict, expires_at: float) -> None:
+        key = self.key(token)
+        with self._lock:
+            self._items[key] = (user_data, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+jwks_cache = JWKSCache(CLERK_JWKS_URL, CLERK_JWKS_PATH)
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+
+async def start_jwks_refresh() -> asyncio.Task:
+    """
+    load the signing keys once and keep them fresh in the background
+    """
+    try:
+        await run_in_threadpool(jwks_cache.refresh)
+    except Exception as e:
+        logger.error(f"Initial JWKS load failed: {str(e)}")
+    return asyncio.create_task(jwks_cache.run())
+
+
+def verify_token(token: str) -> dict:
+    """
+    verify a Clerk session token and return the user data it carries
+    """
+    user_data = token_cache.get(token)
+    if user_data is not None:
+        return user_data
+
+    try:
+        # Get the signing key
+        signing_key = jwks_cache.get_signing_key(token)
+
+        # Verify and decode the token with minimal requirements
+        payload = jwt.decode(
+            token,
+            signing_key,
+            algorithms=["RS256"],
+            options={
+                "verify_aud": False,  # Don't verify audience
+                "verify_exp": True,   # Do verify expiration
+                "verify_iss": True,   # Do verify issuer
+                "require": ["exp"],
+            },
+            issuer=CLERK_ISSUER
+        )
+
+        # Extract user information from the token
+        user_data = {
+            "user_id": payload.get("sub"),
+            "session_id": payload.get("sid"),
+            "issued_at": payload.get("iat"),
+            "expires_at": payload.get("exp")
+        }
+
+        token_cache.set(token, user_data, float(payload["exp"]))
+        logger.info(f"Successfully verified token for user: {user_data['user_id']}")
+        return user_data
+
+    except jwt.InvalidTokenError as e:
+        logger.error(f"Token validation failed: {str(e)}")
+        raise HTTPException(status_code=401, detail="Invalid token")
 
-# Initialize the PyJWKClient
-jwks_client = PyJWKClient(CLERK_JWKS_URL)
 
 async def get_current_user(
     request: Request,
     authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
 ) -> dict:
     if not authorization:
         logger.error("No authorization header provided")
@@ -34,47 +196,10 @@ async def get_current_user(
     try:
         # Extract token from Bearer header
         token = authorization.replace("Bearer ", "")
-        logger.info(f"Processing token: {token[:10]}...")
-
-        try:
-            # Get the signing key
-            signing_key = jwks_client.get_signing_key_from_jwt(token)
-            
-            # Verify and decode the token with minimal requirements
-            payload = jwt.decode(
-                token,
-                signing_key.key,
-                algorithms=["RS256"],
-                options={
-                    "verify_aud": False,  # Don't verify audience
-                    "verify_exp": True,   # Do verify expiration
-                    "verify_iss": True,   # Do verify issuer
-                },
-                issuer="https://liberal-clam-30.clerk.accounts.dev"
-            )
-
-            # Extract user information from the token
-            user_data = {
-                "user_id": payload.get("sub"),
-                "session_id": payload.get("sid"),
-                "issued_at": payload.get("iat"),
-                "expires_at": payload.get("exp")
-            }
-
-            logger.info(f"Successfully verified token for user: {user_data['user_id']}")
-            return user_data
-
-        except jwt.InvalidTokenError as e:
-            logger.error(f"Token validation failed: {str(e)}")
-            raise HTTPException(status_code=401, detail="Invalid token")
+        return verify_token(token)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Authentication error: {str(e)}")
         raise HTTPException(status_code=401, detail=str(e))
-
-
-
-
-
-
-
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Tuple
+
+from fastapi import HTTPException
+
+from app.utils.executor import INFERENCE_QUEUE_SIZE, executor, raise_busy
+from app.utils.model_registry import get_model
+
+logger = logging.getLogger(__name__)
+
+# micro-batching: concurrent requests for the same model share one batched forward pass.
+
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+# how long the first request of a batch waits for others to join
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+# batches of the same model that may run at the same time
+INFERENCE_BATCH_CONCURRENCY = int(os.getenv("INFERENCE_BATCH_CONCURRENCY", "1"))
+
+
+class BatchScheduler:
+    def __init__(
+        self, max_batch_size: int, max_wait_ms: float, concurrency: int, max_queue: int
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(1, max_queue)
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def infer(self, model_name: str, source: Any):
+        """
+        queue a single image (array or path) and wait for its result
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            self._queue(model_name).put_nowait((source, future))
+        except asyncio.QueueFull:
+            logger.warning(f"batch queue is full ({model_name}), rejecting request")
+            raise_busy()
+        return await future
+
+    async def stop(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        self._queues.clear()
+
+    def _queue(self, model_name: str) -> asyncio.Queue:
+        queue = self._queues.get(model_name)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.max_queue)
+            self._queues[model_name] = queue
+            self._tasks[model_name] = asyncio.create_task(
+                self._collect(model_name, queue)
+            )
+        return queue
+
+    async def _collect(self, model_name: str, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        running = set()
+
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # callers that went away (client disconnect) do not need inference
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            await slots.acquire()
+            task = asyncio.create_task(self._dispatch(model_name, batch))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _dispatch(self, model_name: str, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        sources = [source for source, _ in batch]
+        try:
+            results = await executor.run(_predict, model_name, sources)
+        except Exception as e:
+            if not isinstance(e, HTTPException):
+                logger.error(f"batched inference failed ({model_name}): {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def _predict(model_name: str, sources: List[Any]):
+    model = get_model(model_name)
+    return model(sources, batch=len(sources), verbose=False)
+
+
+scheduler = BatchScheduler(
+    INFERENCE_MAX_BATCH_SIZE,
+    INFERENCE_MAX_WAIT_MS,
+    INFERENCE_BATCH_CONCURRENCY,
+    INFERENCE_QUEUE_SIZE,
+)
@@ -0,0 +1,65 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# inference executor: model calls, drawing and encoding run here instead of on the event loop.
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+# jobs allowed to wait for a free worker before requests are rejected with 503
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", "1"))
+
+
+def raise_busy():
+    raise HTTPException(
+        status_code=503,
+        detail="server is busy, please retry later.",
+        headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+    )
+
+
+class InferenceExecutor:
+    def __init__(self, max_workers: int, max_queue: int):
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="inference"
+        )
+        self._capacity = max(1, max_workers) + max(0, max_queue)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        run fn in the executor, or raise 503 right away when the queue is full
+        """
+        with self._lock:
+            if self._pending >= self._capacity:
+                logger.warning("inference queue is full, rejecting request")
+                raise_busy()
+            self._pending += 1
+
+        try:
+            future = self._pool.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release(None)
+            raise
+        # the slot is held until the job finishes, even if the caller goes away
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+
+executor = InferenceExecutor(INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE)
@@ -0,0 +1,14 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+def decode_image(contents: bytes) -> Optional[np.ndarray]:
+    """
+    decode uploaded image bytes into a BGR array (None if the bytes are not an image)
+    """
+    if not contents:
+        return None
+    buffer = np.frombuffer(contents, np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
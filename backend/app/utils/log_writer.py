@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import List
+
+import pytz
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.predict_fire.crud import create_detection_log, create_detection_logs
+from app.db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# write-behind persistence: requests queue their detection log and a background task
+# inserts queued logs in bulk, one transaction per flush.
+
+DETECTION_LOG_WRITE_BEHIND = os.getenv("DETECTION_LOG_WRITE_BEHIND", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# flush when this many logs are queued ...
+DETECTION_LOG_FLUSH_SIZE = int(os.getenv("DETECTION_LOG_FLUSH_SIZE", "200"))
+# ... or when the oldest queued log has waited this long
+DETECTION_LOG_FLUSH_INTERVAL_MS = float(os.getenv("DETECTION_LOG_FLUSH_INTERVAL_MS", "500"))
+# producers wait (back-pressure) once this many logs are queued
+DETECTION_LOG_QUEUE_SIZE = int(os.getenv("DETECTION_LOG_QUEUE_SIZE", "10000"))
+# a failed flush is retried this many times, waiting DETECTION_LOG_RETRY_BACKOFF_MS and
+# doubling it each time; then the logs are inserted one by one and only the ones that
+# still fail are dropped
+DETECTION_LOG_FLUSH_RETRIES = int(os.getenv("DETECTION_LOG_FLUSH_RETRIES", "3"))
+DETECTION_LOG_RETRY_BACKOFF_MS = float(os.getenv("DETECTION_LOG_RETRY_BACKOFF_MS", "100"))
+
+
+class DetectionLogWriter:
+    def __init__(
+        self,
+        flush_size: int,
+        flush_interval_ms: float,
+        max_queue: int,
+        retries: int = DETECTION_LOG_FLUSH_RETRIES,
+        retry_backoff_ms: float = DETECTION_LOG_RETRY_BACKOFF_MS,
+    ):
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000
+        self.max_queue = max(1, max_queue)
+        self.retries = max(0, retries)
+        self.retry_backoff = max(0.0, retry_backoff_ms) / 1000
+        # logs lost after all retries, since start
+        self.dropped = 0
+        self._queue: asyncio.Queue = None
+        self._task: asyncio.Task = None
+        self._flushing: asyncio.Future = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+        logger.info("detection log write-behind enabled")
+
+    async def submit(self, detection_data: dict) -> None:
+        if detection_data.get("created_at") is None:
+            detection_data = {**detection_data, "created_at": datetime.now(pytz.UTC)}
+        await self._queue.put(detection_data)
+
+    async def stop(self) -> None:
+        """
+        stop the writer and flush everything still queued
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._flushing is not None:
+            await self._flushing
+
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+            if len(batch) >= self.flush_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.flush_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # hand the collected logs back so stop() can flush them
+                for item in batch:
+                    self._queue.put_nowait(item)
+                raise
+
+            # a flush that has started is completed even if the writer is stopped
+            self._flushing = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._flushing)
+
+    async def _flush(self, batch: List[dict]) -> None:
+        backoff = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                await _insert_batch(batch)
+                return
+            except Exception as e:
+                logger.warning(
+                    f"failed to write {len(batch)} detection logs "
+                    f"(attempt {attempt + 1}/{self.retries + 1}): {str(e)}"
+                )
+            if attempt < self.retries:
+                await asyncio.sleep(backoff)
+                backoff *= 2
+
+        # one bad log should not take the rest of the batch with it
+        for detection_data in batch:
+            try:
+                await _insert_one(detection_data)
+            except Exception as e:
+                self.dropped += 1
+                logger.error(
+                    f"dropped detection log {detection_data.get('id')} "
+                    f"({self.dropped} dropped so far): {str(e)}"
+                )
+
+
+async def _insert_batch(batch: List[dict]) -> None:
+    async with AsyncSessionLocal() as db:
+        await create_detection_logs(db, batch)
+
+
+async def _insert_one(detection_data: dict) -> None:
+    async with AsyncSessionLocal() as db:
+        await create_detection_log(db, detection_data)
+
+
+log_writer = DetectionLogWriter(
+    DETECTION_LOG_FLUSH_SIZE, DETECTION_LOG_FLUSH_INTERVAL_MS, DETECTION_LOG_QUEUE_SIZE
+)
+
+
+async def save_detection_log(db: AsyncSession, detection_data: dict) -> None:
+    """
+    queue the log when write-behind is running, otherwise insert and commit it now
+    """
+    if log_writer.running:
+        await log_writer.submit(detection_data)
+    else:
+        await create_detection_log(db, detection_data)
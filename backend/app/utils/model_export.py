@@ -0,0 +1,261 @@
+import argparse
+import glob
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Iterator, List, Optional
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from app.utils.model_registry import MODEL_PATHS, runtime_path
+from app.utils.postprocess import box_iou
+
+# build-time export of the PyTorch weights to faster CPU runtimes, run from the backend directory:
+#   python -m app.utils.model_export export fire --runtime onnx
+#   python -m app.utils.model_export export fire --runtime openvino --int8 --calibration data/calib
+#   python -m app.utils.model_export parity fire --runtime openvino --int8 --images data/val
+# the server picks the artifacts up with MODEL_RUNTIME=onnx|openvino (MODEL_PRECISION=int8).
+#
+# optional dependencies: onnx + onnxruntime (onnx), openvino + nncf (openvino, int8)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ("jpg", "jpeg", "png", "bmp", "webp")
+CALIBRATION_LIMIT = 300  # images; a few hundred representative frames are enough
+
+
+def list_images(directory: str, limit: Optional[int] = None) -> List[str]:
+    paths = sorted(
+        path
+        for ext in IMAGE_EXTENSIONS
+        for path in glob.glob(os.path.join(directory, "**", f"*.{ext}"), recursive=True)
+    )
+    if not paths:
+        raise ValueError(f"no images found in {directory}")
+    return paths[:limit] if limit else paths
+
+
+def letterbox(img: np.ndarray, imgsz: int) -> np.ndarray:
+    """
+    BGR image -> 1x3ximgszximgsz float32 input, preprocessed like ultralytics does
+    """
+    h, w = img.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    nh, nw = round(h * scale), round(w * scale)
+    resized = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas[top : top + nh, left : left + nw] = resized
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1)  # BGR HWC -> RGB CHW
+    return np.ascontiguousarray(tensor[None], dtype=np.float32) / 255.0
+
+
+class CalibrationReader:
+    """
+    onnxruntime calibration data reader over a directory of images
+    """
+
+    def __init__(self, input_name: str, paths: List[str], imgsz: int):
+        self.input_name = input_name
+        self.paths = paths
+        self.imgsz = imgsz
+        self._iter = self._batches()
+
+    def _batches(self) -> Iterator[dict]:
+        for path in self.paths:
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
+            if img is None:
+                logger.warning(f"skipping unreadable calibration image: {path}")
+                continue
+            yield {self.input_name: letterbox(img, self.imgsz)}
+
+    def get_next(self) -> Optional[dict]:
+        return next(self._iter, None)
+
+    def rewind(self) -> None:
+        self._iter = self._batches()
+
+
+def quantize_onnx(fp32_path: str, int8_path: str, calibration: str, imgsz: int) -> str:
+    """
+    static INT8 post-training quantization (QDQ, per-channel weights)
+    """
+    import onnxruntime
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    input_name = onnxruntime.InferenceSession(
+        fp32_path, providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+    reader = CalibrationReader(input_name, list_images(calibration, CALIBRATION_LIMIT), imgsz)
+    quantize_static(
+        fp32_path,
+        int8_path,
+        reader,
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    return int8_path
+
+
+def calibration_yaml(calibration: str, names: dict) -> str:
+    """
+    minimal dataset yaml for ultralytics' OpenVINO INT8 export (images only, no labels)
+    """
+    fd, path = tempfile.mkstemp(suffix=".yaml")
+    with os.fdopen(fd, "w") as f:
+        f.write(f"path: {os.path.abspath(calibration)}\ntrain: .\nval: .\n")
+        f.write("names:\n")
+        for index, name in sorted(names.items()):
+            f.write(f"  {index}: {name}\n")
+    return path
+
+
+def export_model(
+    name: str,
+    runtime: str,
+    int8: bool = False,
+    calibration: Optional[str] = None,
+    imgsz: int = 640,
+) -> str:
+    """
+    export MODEL_PATHS[name] to runtime; returns the artifact path the registry loads
+    """
+    if int8 and not calibration:
+        raise ValueError("INT8 export needs a calibration image directory")
+
+    weights = MODEL_PATHS[name]
+    model = YOLO(weights)
+    # dynamic batch axis, so the batch scheduler can still group requests
+    if runtime == "onnx":
+        path = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            path = quantize_onnx(path, runtime_path(weights, "onnx", "int8"), calibration, imgsz)
+    elif runtime == "openvino":
+        data = calibration_yaml(calibration, model.names) if int8 else None
+        try:
+            path = model.export(
+                format="openvino", imgsz=imgsz, dynamic=True, int8=int8, data=data
+            )
+        finally:
+            if data:
+                os.remove(data)
+    else:
+        raise ValueError(f"unknown runtime: {runtime}")
+
+    expected = runtime_path(weights, runtime, "int8" if int8 else "fp32")
+    if os.path.abspath(path) != os.path.abspath(expected):
+        raise RuntimeError(f"exported {path}, but the registry expects {expected}")
+    logger.info(f"exported {name} -> {path}")
+    return path
+
+
+def match_detections(reference: np.ndarray, candidate: np.ndarray, iou: float) -> List[tuple]:
+    """
+    greedy one-to-one matching of (N, 6) [x1, y1, x2, y2, conf, cls] arrays by class and IoU;
+    returns (reference index, candidate index) pairs
+    """
+    if not len(reference) or not len(candidate):
+        return []
+    ious = box_iou(reference[:, :4], candidate[:, :4])
+    ious[reference[:, 5][:, None] != candidate[:, 5][None, :]] = 0
+    pairs = []
+    for r in np.argsort(-reference[:, 4]):
+        c = int(np.argmax(ious[r]))
+        if ious[r, c] >= iou:
+            pairs.append((int(r), c))
+            ious[:, c] = 0
+    return pairs
+
+
+def parity_check(
+    name: str,
+    runtime: str,
+    int8: bool,
+    images: str,
+    iou: float = 0.5,
+    min_match: float = 0.95,
+    limit: Optional[int] = None,
+) -> dict:
+    """
+    compare an exported model's detections (and speed) against the PyTorch weights
+    """
+    weights = MODEL_PATHS[name]
+    reference_model = YOLO(weights)
+    candidate_model = YOLO(runtime_path(weights, runtime, "int8" if int8 else "fp32"), task="detect")
+
+    report = {"images": 0, "reference_boxes": 0, "candidate_boxes": 0, "matched": 0}
+    conf_diffs: List[float] = []
+    timings = {"reference": 0.0, "candidate": 0.0}
+    for path in list_images(images, limit):
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        outputs = {}
+        for key, model in (("reference", reference_model), ("candidate", candidate_model)):
+            start = time.perf_counter()
+            result = model(img, verbose=False)[0]
+            timings[key] += time.perf_counter() - start
+            outputs[key] = result.boxes.data.cpu().numpy()
+
+        pairs = match_detections(outputs["reference"], outputs["candidate"], iou)
+        conf_diffs.extend(
+            abs(float(outputs["reference"][r, 4] - outputs["candidate"][c, 4])) for r, c in pairs
+        )
+        report["images"] += 1
+        report["reference_boxes"] += len(outputs["reference"])
+        report["candidate_boxes"] += len(outputs["candidate"])
+        report["matched"] += len(pairs)
+
+    # first call of each model includes graph setup; fine for a relative comparison
+    report["recall"] = report["matched"] / max(report["reference_boxes"], 1)
+    report["precision"] = report["matched"] / max(report["candidate_boxes"], 1)
+    report["mean_conf_diff"] = float(np.mean(conf_diffs)) if conf_diffs else 0.0
+    report["max_conf_diff"] = float(np.max(conf_diffs)) if conf_diffs else 0.0
+    report["reference_ms"] = 1000 * timings["reference"] / max(report["images"], 1)
+    report["candidate_ms"] = 1000 * timings["candidate"] / max(report["images"], 1)
+    report["speedup"] = timings["reference"] / max(timings["candidate"], 1e-9)
+    report["passed"] = report["recall"] >= min_match and report["precision"] >= min_match
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="model export for CPU runtimes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="export weights to onnx / openvino")
+    parity_parser = commands.add_parser("parity", help="compare an export against torch")
+    for sub in (export_parser, parity_parser):
+        sub.add_argument("model", choices=sorted(MODEL_PATHS))
+        sub.add_argument("--runtime", choices=["onnx", "openvino"], required=True)
+        sub.add_argument("--int8", action="store_true")
+    export_parser.add_argument("--calibration", help="image directory for INT8 calibration")
+    export_parser.add_argument("--imgsz", type=int, default=640)
+    parity_parser.add_argument("--images", required=True, help="image directory to compare on")
+    parity_parser.add_argument("--iou", type=float, default=0.5)
+    parity_parser.add_argument("--min-match", type=float, default=0.95)
+    parity_parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_model(args.model, args.runtime, args.int8, args.calibration, args.imgsz)
+        return
+
+    report = parity_check(
+        args.model, args.runtime, args.int8, args.images, args.iou, args.min_match, args.limit
+    )
+    for key, value in report.items():
+        logger.info(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+    if not report["passed"]:
+        logger.error("parity check failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
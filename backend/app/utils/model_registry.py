@@ -0,0 +1,206 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from ultralytics import YOLO
+
+from app.utils.executor import executor
+
+logger = logging.getLogger(__name__)
+
+# model registry: every router gets its YOLO model from here instead of loading weights per request.
+
+MODEL_PATHS: Dict[str, str] = {
+    "fire": "app/assets/best.pt",
+    "metal": "app/assets/metal_classifier.pt",
+}
+
+# models loaded (and warmed up) in the FastAPI lifespan, comma separated
+MODEL_PRELOAD = [
+    name.strip()
+    for name in os.getenv("MODEL_PRELOAD", "fire,metal").split(",")
+    if name.strip()
+]
+# memory cap for loaded models; the least recently used model is evicted first
+MODEL_REGISTRY_MAX_MB = float(os.getenv("MODEL_REGISTRY_MAX_MB", "1024"))
+MODEL_WARMUP_IMGSZ = int(os.getenv("MODEL_WARMUP_IMGSZ", "640"))
+
+# inference runtime: torch | onnx | openvino
+# onnx / openvino load the artifacts written by `python -m app.utils.model_export export`
+# (next to the .pt weights); models without an exported artifact fall back to torch.
+MODEL_RUNTIME = os.getenv("MODEL_RUNTIME", "torch").lower()
+# fp32 | int8 (int8 artifacts need a calibration set at export time)
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32").lower()
+
+
+def runtime_path(weights: str, runtime: str, precision: str = "fp32") -> str:
+    """
+    exported artifact path for weights, e.g. best.pt -> best_int8.onnx / best_openvino_model
+    """
+    if runtime == "torch":
+        return weights
+    stem = os.path.splitext(weights)[0]
+    suffix = "_int8" if precision == "int8" else ""
+    if runtime == "onnx":
+        return f"{stem}{suffix}.onnx"
+    if runtime == "openvino":
+        return f"{stem}{suffix}_openvino_model"
+    raise ValueError(f"unknown MODEL_RUNTIME: {runtime}")
+
+
+def resolve_model_path(weights: str) -> str:
+    """
+    path actually loaded for weights under MODEL_RUNTIME / MODEL_PRECISION
+    """
+    path = runtime_path(weights, MODEL_RUNTIME, MODEL_PRECISION)
+    if path != weights and not os.path.exists(path):
+        return weights
+    return path
+
+
+def path_size(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(dirpath, filename))
+        for dirpath, _, filenames in os.walk(path)
+        for filename in filenames
+    )
+
+
+class ModelRegistry:
+    def __init__(self, paths: Dict[str, str], max_bytes: int):
+        self._paths = paths
+        self._max_bytes = max_bytes
+        self._models: "OrderedDict[str, YOLO]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        # class names outlive eviction, so they never need the model (or a load)
+        self._names: Dict[str, Dict[int, str]] = {}
+        # guards the dicts only; loads hold a per-model lock, never this one
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, name: str) -> YOLO:
+        """
+        return the model for name, loading it on first use (blocking: off the event loop,
+        use get_model_async)
+        """
+        with self._lock:
+            model = self._lookup(name)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # concurrent callers of the same model wait for one load; other models are not blocked
+        with load_lock:
+            with self._lock:
+                model = self._lookup(name)
+                if model is not None:
+                    return model
+
+            model, size = self._load(name)
+            with self._lock:
+                self._models[name] = model
+                self._sizes[name] = size
+                self._names[name] = dict(model.names)
+                self._evict(keep=name)
+            return model
+
+    def get_loaded(self, name: str) -> Optional[YOLO]:
+        with self._lock:
+            return self._lookup(name)
+
+    def names(self, name: str) -> Optional[Dict[int, str]]:
+        """
+        class names of a model that has been loaded before (None if it never was)
+        """
+        with self._lock:
+            return self._names.get(name)
+
+    def _lookup(self, name: str) -> Optional[YOLO]:
+        model = self._models.get(name)
+        if model is not None:
+            self._models.move_to_end(name)
+        return model
+
+    def warmup(self, name: str) -> None:
+        """
+        run a dummy inference so the first real request does not pay for graph setup
+        """
+        model = self.get(name)
+        dummy = np.zeros((MODEL_WARMUP_IMGSZ, MODEL_WARMUP_IMGSZ, 3), dtype=np.uint8)
+        model(dummy, verbose=False)
+        logger.info(f"model warmed up: {name}")
+
+    def is_loaded(self, name: str) -> bool:
+        with self._lock:
+            return name in self._models
+
+    def loaded(self) -> List[str]:
+        with self._lock:
+            return list(self._models.keys())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._sizes.clear()
+
+    def _load(self, name: str) -> Tuple[YOLO, int]:
+        if name not in self._paths:
+            raise KeyError(f"unknown model: {name}")
+
+        path = resolve_model_path(self._paths[name])
+        if MODEL_RUNTIME != "torch" and path == self._paths[name]:
+            logger.warning(f"no {MODEL_RUNTIME} export found for model {name}, using torch")
+        # exported models don't carry the task, both models are detectors
+        model = YOLO(path, task="detect")
+        logger.info(f"model loaded: {name} ({path})")
+        # weight file size is a close enough estimate of the resident size of the model
+        return model, path_size(path)
+
+    def _evict(self, keep: str) -> None:
+        while len(self._models) > 1 and self._total_bytes() > self._max_bytes:
+            name = next(iter(self._models))
+            if name == keep:
+                break
+            del self._models[name]
+            del self._sizes[name]
+            logger.info(f"model evicted: {name}")
+
+    def _total_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+
+registry = ModelRegistry(MODEL_PATHS, max_bytes=int(MODEL_REGISTRY_MAX_MB * 1024 * 1024))
+
+
+def get_model(name: str) -> YOLO:
+    return registry.get(name)
+
+
+async def get_model_async(name: str) -> YOLO:
+    """
+    get_model for request handlers: a model that is not loaded is loaded in the executor
+    """
+    model = registry.get_loaded(name)
+    if model is not None:
+        return model
+    return await executor.run(registry.get, name)
+
+
+async def class_names(name: str) -> Dict[int, str]:
+    names = registry.names(name)
+    if names is not None:
+        return names
+    return (await get_model_async(name)).names
+
+
+def load_models(names: Optional[List[str]] = None) -> None:
+    """
+    load and warm up models at startup (called from the FastAPI lifespan)
+    """
+    for name in names if names is not None else MODEL_PRELOAD:
+        registry.warmup(name)
@@ -0,0 +1,107 @@
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.utils.postprocess import Detections
+
+# motion gate for camera streams: each frame is compared with the last frame the model
+# analyzed on a small grayscale thumbnail; while the scene is unchanged the previous
+# detections are reused and inference is skipped, except for a forced re-check every
+# MOTION_RECHECK_INTERVAL seconds.
+
+# default for requests without ?motion_gate=true|false (off unless MOTION_GATE=1)
+MOTION_GATE = os.getenv("MOTION_GATE", "0").lower() in ("1", "true", "yes")
+# thumbnail width in pixels (height follows the aspect ratio)
+MOTION_THUMBNAIL_WIDTH = int(os.getenv("MOTION_THUMBNAIL_WIDTH", "128"))
+# gray level difference (0-255) for a thumbnail pixel to count as changed
+MOTION_PIXEL_THRESHOLD = int(os.getenv("MOTION_PIXEL_THRESHOLD", "20"))
+# fraction of changed pixels that counts as motion
+MOTION_AREA_THRESHOLD = float(os.getenv("MOTION_AREA_THRESHOLD", "0.005"))
+# seconds after which a frame is analyzed even without motion
+MOTION_RECHECK_INTERVAL = float(os.getenv("MOTION_RECHECK_INTERVAL", "10"))
+# gates of cameras that sent nothing for this many seconds are dropped
+MOTION_GATE_IDLE = float(os.getenv("MOTION_GATE_IDLE", "600"))
+
+
+def motion_thumbnail(contents: bytes) -> Optional[np.ndarray]:
+    """
+    small grayscale thumbnail of encoded frame bytes (None if the bytes are not an image);
+    JPEG frames are decoded at 1/4 scale, much cheaper than a full decode
+    """
+    if not contents:
+        return None
+    img = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if img is None:
+        return None
+    h, w = img.shape[:2]
+    width = min(MOTION_THUMBNAIL_WIDTH, w)
+    height = max(1, round(h * width / w))
+    return cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+
+
+class MotionGate:
+    """
+    state of one camera: thumbnail and detections of the last analyzed frame
+    """
+
+    def __init__(self):
+        self.reference: Optional[np.ndarray] = None
+        self.detections: Optional[Detections] = None
+        self.analyzed_at = 0.0
+        self.last_seen = 0.0
+
+    def has_motion(self, thumbnail: np.ndarray) -> bool:
+        if self.reference is None or self.reference.shape != thumbnail.shape:
+            return True
+        changed = cv2.absdiff(thumbnail, self.reference) > MOTION_PIXEL_THRESHOLD
+        return changed.mean() > MOTION_AREA_THRESHOLD
+
+    def check(self, thumbnail: np.ndarray, now: Optional[float] = None) -> Optional[Detections]:
+        """
+        the previous detections if the frame can skip inference, None if it must be analyzed
+        """
+        now = time.time() if now is None else now
+        self.last_seen = now
+        if self.detections is None or now - self.analyzed_at >= MOTION_RECHECK_INTERVAL:
+            return None
+        # compared with the last analyzed frame, not the previous one, so slow changes add up
+        if self.has_motion(thumbnail):
+            return None
+        return self.detections
+
+    def analyzed(
+        self, thumbnail: np.ndarray, detections: Detections, now: Optional[float] = None
+    ) -> None:
+        self.reference = thumbnail
+        self.detections = detections
+        self.analyzed_at = time.time() if now is None else now
+
+
+class MotionGates:
+    """
+    gates of this process, keyed by (user_id, camera_id)
+    """
+
+    def __init__(self):
+        self._gates: Dict[Tuple[str, str], MotionGate] = {}
+        self._evicted_at = time.time()
+
+    def get(self, camera: Tuple[str, str]) -> MotionGate:
+        now = time.time()
+        if now - self._evicted_at > MOTION_GATE_IDLE:
+            self._gates = {
+                key: gate
+                for key, gate in self._gates.items()
+                if now - gate.last_seen <= MOTION_GATE_IDLE
+            }
+            self._evicted_at = now
+        gate = self._gates.get(camera)
+        if gate is None:
+            gate = self._gates[camera] = MotionGate()
+        return gate
+
+
+motion_gates = MotionGates()
@@ -0,0 +1,170 @@
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pytz
+
+# shared post-processing for model outputs: boxes are copied to the host once
+# (result.boxes.data, one (N, 6) [x1, y1, x2, y2, conf, cls] array) and stay in compact
+# arrays until the response is serialized, instead of a per-box tensor access loop.
+
+
+def name_table(names: Dict[int, str]) -> np.ndarray:
+    """
+    class id -> name lookup array for a model's names dict
+    """
+    table = np.empty(max(names) + 1 if names else 0, dtype=object)
+    for index, name in names.items():
+        table[index] = name
+    return table
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    pairwise IoU of two (N, 4) / (M, 4) xyxy arrays
+    """
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class Detections:
+    """
+    array-backed detections: xyxy (N, 4) float32, confidence (N,) float32,
+    class_id (N,) int32, plus the model's class names
+    """
+
+    __slots__ = ("xyxy", "confidence", "class_id", "names")
+
+    def __init__(
+        self,
+        xyxy: np.ndarray,
+        confidence: np.ndarray,
+        class_id: np.ndarray,
+        names: np.ndarray,
+    ):
+        self.xyxy = xyxy
+        self.confidence = confidence
+        self.class_id = class_id
+        self.names = names
+
+    @classmethod
+    def from_array(cls, data: np.ndarray, names: Dict[int, str]) -> "Detections":
+        """
+        from an (N, 6+) [x1, y1, x2, y2, conf, cls] array
+        """
+        data = np.asarray(data, dtype=np.float32)
+        return cls(
+            np.ascontiguousarray(data[:, :4]),
+            np.ascontiguousarray(data[:, 4]),
+            data[:, 5].astype(np.int32),
+            name_table(names),
+        )
+
+    @classmethod
+    def from_result(cls, result, names: Dict[int, str]) -> "Detections":
+        """
+        from an ultralytics Results object, with a single device-to-host transfer
+        """
+        return cls.from_array(result.boxes.data.cpu().numpy(), names)
+
+    @classmethod
+    def from_list(cls, items: List[dict]) -> "Detections":
+        """
+        from serialized detections (cache entries, stored logs)
+        """
+        labels = sorted({item["class_name"] for item in items})
+        index = {name: i for i, name in enumerate(labels)}
+        return cls(
+            np.array([item["bbox"] for item in items], dtype=np.float32).reshape(-1, 4),
+            np.array([item["confidence"] for item in items], dtype=np.float32),
+            np.array([index[item["class_name"]] for item in items], dtype=np.int32),
+            name_table(dict(enumerate(labels))),
+        )
+
+    @classmethod
+    def concatenate(cls, parts: Iterable["Detections"]) -> "Detections":
+        """
+        join detections of the same model (e.g. the frames of a video)
+        """
+        parts = list(parts)
+        if not parts:
+            raise ValueError("nothing to concatenate")
+        return cls(
+            np.concatenate([p.xyxy for p in parts]),
+            np.concatenate([p.confidence for p in parts]),
+            np.concatenate([p.class_id for p in parts]),
+            parts[0].names,
+        )
+
+    def __len__(self) -> int:
+        return len(self.confidence)
+
+    def class_mask(self, class_name: str) -> np.ndarray:
+        return self.names[self.class_id] == class_name
+
+    def filter(
+        self,
+        min_confidence: Optional[float] = None,
+        classes: Optional[Iterable[str]] = None,
+    ) -> "Detections":
+        mask = np.ones(len(self), dtype=bool)
+        if min_confidence is not None:
+            mask &= self.confidence >= min_confidence
+        if classes is not None:
+            mask &= np.isin(self.names[self.class_id], list(classes))
+        return self[mask]
+
+    def __getitem__(self, index) -> "Detections":
+        return Detections(
+            self.xyxy[index], self.confidence[index], self.class_id[index], self.names
+        )
+
+    def has_class(self, class_name: str) -> bool:
+        return bool(self.class_mask(class_name).any())
+
+    def max_confidence(self, class_name: Optional[str] = None) -> float:
+        scores = self.confidence
+        if class_name is not None:
+            scores = scores[self.class_mask(class_name)]
+        return float(scores.max()) if len(scores) else 0.0
+
+    def to_list(self) -> List[dict]:
+        """
+        serialized form ({class_name, confidence, bbox} dicts), built once per response
+        """
+        return [
+            {"class_name": name, "confidence": confidence, "bbox": bbox}
+            for name, confidence, bbox in zip(
+                self.names[self.class_id].tolist(),
+                self.confidence.tolist(),
+                self.xyxy.tolist(),
+            )
+        ]
+
+
+def current_time() -> str:
+    """
+    display time of a detection (Asia/Seoul)
+    """
+    return datetime.now(pytz.timezone("Asia/Seoul")).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def build_detection_log(detections: Detections, message: str, file_name=None) -> dict:
+    """
+    detection log / response payload for detections of the fire model
+    """
+    return {
+        "id": str(uuid.uuid4()),
+        "message": message,
+        "has_fire": detections.has_class("fire"),
+        "confidence_score": detections.max_confidence("fire"),
+        "file_name": file_name,
+        "detections": detections.to_list(),
+        "result_image": None,
+        "date": current_time(),
+    }
@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from app.utils.storage import shard_key
+from app.utils.storage_backend import backend
+
+logger = logging.getLogger(__name__)
+
+# result images are drawn, encoded and stored (local disk or object storage, see
+# storage_backend) by a background pool after the response is sent;
+# the response only carries the storage key.
+
+# jpg | webp | png
+RESULT_IMAGE_FORMAT = os.getenv("RESULT_IMAGE_FORMAT", "jpg").lower()
+RESULT_IMAGE_QUALITY = int(os.getenv("RESULT_IMAGE_QUALITY", "85"))
+# render: store the annotated image
+# boxes:  store the original image and its boxes (<name>.json); boxes are drawn on demand
+#         by GET /result_image/{name}
+RESULT_IMAGE_MODE = os.getenv("RESULT_IMAGE_MODE", "render").lower()
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+
+_pool = ThreadPoolExecutor(max_workers=max(1, RENDER_WORKERS), thread_name_prefix="render")
+
+
+def result_image_name() -> str:
+    """
+    storage key of a new result image (sharded, served under /log/<key>)
+    """
+    return shard_key(f"{uuid.uuid4()}.{RESULT_IMAGE_FORMAT}")
+
+
+def image_format(name: str) -> str:
+    return os.path.splitext(name)[1].lstrip(".").lower()
+
+
+def encode_image(img: np.ndarray, fmt: str) -> bytes:
+    if fmt in ("jpg", "jpeg"):
+        params = [cv2.IMWRITE_JPEG_QUALITY, RESULT_IMAGE_QUALITY]
+    elif fmt == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, RESULT_IMAGE_QUALITY]
+    else:
+        params = [cv2.IMWRITE_PNG_COMPRESSION, 3]
+    ok, buffer = cv2.imencode(f".{fmt}", img, params)
+    if not ok:
+        raise ValueError(f"failed to encode image as {fmt}")
+    return buffer.tobytes()
+
+
+def draw_boxes(img: np.ndarray, detections: List[dict]) -> np.ndarray:
+    """
+    draw detection boxes and labels on a copy of img
+    """
+    annotated = img.copy()
+    thickness = max(1, round(sum(img.shape[:2]) / 1000))
+    for d in detections:
+        x1, y1, x2, y2 = (int(v) for v in d["bbox"])
+        color = (0, 0, 255) if d["class_name"] == "fire" else (255, 128, 0)
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), color, thickness)
+        label = f"{d['class_name']} {d['confidence']:.2f}"
+        cv2.putText(
+            annotated,
+            label,
+            (x1, max(y1 - 4, 12)),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5 * thickness,
+            color,
+            thickness,
+        )
+    return annotated
+
+
+def boxes_key(name: str) -> str:
+    return f"{name}.json"
+
+
+def render_result_image(name: str, img: np.ndarray, detections: List[dict], result=None) -> str:
+    if RESULT_IMAGE_MODE == "boxes":
+        image = img
+        # boxes first, so the image is never readable without them
+        backend.put(boxes_key(name), json.dumps(detections).encode())
+    elif result is not None:
+        image = result.plot()
+    else:
+        image = draw_boxes(img, detections)
+
+    backend.put(name, encode_image(image, image_format(name)))
+    return name
+
+
+def load_result_image(name: str) -> Optional[bytes]:
+    """
+    encoded annotated image for name; draws the boxes when only boxes were stored
+    """
+    content = backend.get(name)
+    if content is None:
+        return None
+
+    boxes = backend.get(boxes_key(name))
+    if boxes is not None:
+        img = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+        return encode_image(draw_boxes(img, json.loads(boxes)), image_format(name))
+
+    return content
+
+
+def schedule_result_image(
+    name: str, img: np.ndarray, detections: List[dict], result=None
+) -> Future:
+    """
+    render and store the result image in the background pool
+    """
+    future = _pool.submit(render_result_image, name, img, detections, result)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def _log_failure(future: Future) -> None:
+    error: Optional[BaseException] = None if future.cancelled() else future.exception()
+    if error is not None:
+        logger.error(f"failed to save result image: {str(error)}")
+
+
+def shutdown() -> None:
+    # let queued images finish so no result_image is left pointing at nothing
+    _pool.shutdown(wait=True)
@@ -0,0 +1,63 @@
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+from starlette.requests import HTTPConnection
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for msgpack clients (camera gateways)
+    msgpack = None
+
+# response serialization for the detection and log endpoints:
+# - JSON is encoded with orjson (also the app's default response class)
+# - clients sending "Accept: application/msgpack" get msgpack instead
+# - respond() returns the Response directly, so FastAPI does not validate the
+#   already-typed content against response_model a second time
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def wants_msgpack(connection: HTTPConnection) -> bool:
+    if msgpack is None:
+        return False
+    accept = connection.headers.get("accept", "").lower()
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def to_content(content: Any) -> Any:
+    if isinstance(content, BaseModel):
+        return content.model_dump(mode="json")
+    return content
+
+
+def respond(
+    connection: HTTPConnection,
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    serialize content (a model built with model_construct, or plain dicts) in the format
+    the client accepts
+    """
+    response_class = MsgPackResponse if wants_msgpack(connection) else ORJSONResponse
+    return response_class(to_content(content), status_code=status_code, headers=headers)
+
+
+def encode(content: Any, use_msgpack: bool = False) -> bytes:
+    """
+    serialized bytes for a websocket message (msgpack or orjson)
+    """
+    content = to_content(content)
+    if use_msgpack:
+        return msgpack.packb(content, use_bin_type=True)
+    return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.utils.model_registry import MODEL_PATHS, resolve_model_path
+
+logger = logging.getLogger(__name__)
+
+# content-addressed inference cache: byte-identical uploads for the same model and
+# parameters reuse the detections of the first request instead of running the model.
+
+# in-memory entries (0 disables the cache)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "600"))  # seconds
+# optional on-disk tier shared by workers and kept across restarts
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR")
+
+# response header reporting HIT / MISS
+CACHE_HEADER = "X-Cache"
+
+
+def model_identity(model_name: str) -> str:
+    """
+    model name plus its weights (and runtime), so replaced weights never serve stale results
+    """
+    path = resolve_model_path(MODEL_PATHS[model_name]) if model_name in MODEL_PATHS else ""
+    try:
+        stat = os.stat(path)
+        return f"{model_name}:{path}:{stat.st_size}:{int(stat.st_mtime)}"
+    except OSError:
+        return f"{model_name}:{path}"
+
+
+class ResultCache:
+    def __init__(self, max_size: int, ttl: int, directory: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.directory = directory
+        self._items: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def key(self, model_name: str, contents: bytes, params: Optional[dict] = None) -> str:
+        digest = hashlib.sha256()
+        digest.update(model_identity(model_name).encode())
+        digest.update(json.dumps(params or {}, sort_keys=True).encode())
+        digest.update(contents)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                stored_at, value = item
+                if now - stored_at < self.ttl:
+                    self._items.move_to_end(key)
+                    return value
+                del self._items[key]
+
+        if self.directory:
+            item = self._read_disk(key)
+            if item is not None and now - item[0] < self.ttl:
+                self._remember(key, item)
+                return item[1]
+        return None
+
+    def set(self, key: str, value: dict) -> None:
+        if not self.enabled:
+            return
+        item = (time.time(), value)
+        self._remember(key, item)
+        if self.directory:
+            self._write_disk(key, item)
+
+    def _remember(self, key: str, item: Tuple[float, dict]) -> None:
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, dict]]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            return data["stored_at"], data["value"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"unreadable result cache entry {path}: {str(e)}")
+            return None
+
+    def _write_disk(self, key: str, item: Tuple[float, dict]) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write then rename so readers never see a partial entry
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"stored_at": item[0], "value": item[1]}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"failed to write result cache entry {path}: {str(e)}")
+
+    def prune_disk(self) -> int:
+        """
+        delete expired on-disk entries (and stale partial writes); run by the storage sweep
+        """
+        if not self.directory or not os.path.isdir(self.directory):
+            return 0
+        # entries are written once, so mtime is the time they were stored
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logger.warning(f"failed to remove result cache entry {entry.path}: {str(e)}")
+            try:
+                os.rmdir(shard.path)  # only succeeds once the shard is empty
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"expired result cache entries removed: {removed}")
+        return removed
+
+
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL, RESULT_CACHE_DIR)
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import time
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.staticfiles import StaticFiles
+
+from app.utils.result_cache import result_cache
+
+logger = logging.getLogger(__name__)
+
+# storage manager for the temp/ and log/ directories:
+# - result images are sharded into hashed subdirectories (log/ab/cd/<name>)
+# - temp/ files older than TEMP_MAX_AGE_HOURS are removed at startup and by the sweep
+#   (anything that old belongs to a dead request; newer files may be in use by other workers)
+# - a background sweep keeps log/ under an age and a total size limit, and deletes expired
+#   entries of the on-disk result cache
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_DIR = os.getenv("LOG_DIR", os.path.join(APP_DIR, "log"))
+TEMP_DIR = os.getenv("TEMP_DIR", os.path.join(APP_DIR, "temp"))
+# uploaded videos of background jobs; unlike temp/ it survives restarts (jobs are resumed)
+JOB_DIR = os.getenv("JOB_DIR", os.path.join(APP_DIR, "jobs"))
+
+# result images older than this are deleted (0 keeps them forever)
+LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", "30"))
+# oldest result images are deleted while log/ is larger than this (0 = no limit)
+LOG_MAX_MB = float(os.getenv("LOG_MAX_MB", "10240"))
+# temp files older than this are treated as orphans (at startup and by the sweep)
+TEMP_MAX_AGE_HOURS = float(os.getenv("TEMP_MAX_AGE_HOURS", "24"))
+STORAGE_SWEEP_INTERVAL = int(os.getenv("STORAGE_SWEEP_INTERVAL", "600"))  # seconds
+
+# companion files that are deleted together with their image (e.g. stored boxes)
+SIDECAR_SUFFIXES = (".json",)
+# the only files /log serves; sidecars and anything else in LOG_DIR stay private
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+class ImageFiles(StaticFiles):
+    """
+    StaticFiles limited to result images
+    """
+
+    async def get_response(self, path: str, scope):
+        if not path.lower().endswith(IMAGE_SUFFIXES):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+
+def shard_key(name: str) -> str:
+    """
+    relative storage key for a file name, e.g. "3f/a2/<name>"
+    """
+    digest = hashlib.sha1(name.encode()).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}/{name}"
+
+
+def log_path(key: str) -> str:
+    """
+    absolute path of a storage key inside LOG_DIR (raises ValueError outside of it)
+    """
+    root = os.path.realpath(LOG_DIR)
+    path = os.path.realpath(os.path.join(root, key))
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise ValueError(f"invalid storage key: {key}")
+    return path
+
+
+def ensure_dirs() -> None:
+    os.makedirs(LOG_DIR, exist_ok=True)
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    os.makedirs(JOB_DIR, exist_ok=True)
+
+
+def cleanup_temp(max_age: float = 0) -> int:
+    """
+    delete files in TEMP_DIR older than max_age seconds (all files when 0)
+    """
+    removed = 0
+    now = time.time()
+    for entry in os.scandir(TEMP_DIR):
+        try:
+            if max_age and now - entry.stat().st_mtime < max_age:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+            removed += 1
+        except OSError as e:
+            logger.warning(f"failed to remove temp file {entry.path}: {str(e)}")
+    if removed:
+        logger.info(f"temp files removed: {removed}")
+    return removed
+
+
+def _scan_log_dir() -> Tuple[List[Tuple[float, int, str]], int]:
+    files = []
+    total = 0
+    for dirpath, _, filenames in os.walk(LOG_DIR):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            total += stat.st_size
+            files.append((stat.st_mtime, stat.st_size, path))
+    return files, total
+
+
+def _remove(path: str) -> int:
+    freed = 0
+    for candidate in (path, *(path + suffix for suffix in SIDECAR_SUFFIXES)):
+        try:
+            freed += os.path.getsize(candidate)
+            os.remove(candidate)
+        except FileNotFoundError:
+            continue
+    return freed
+
+
+def _remove_empty_dirs() -> None:
+    for dirpath, _, _ in os.walk(LOG_DIR, topdown=False):
+        # listed again: child directories may have just been removed
+        if dirpath != LOG_DIR and not os.listdir(dirpath):
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+
+def sweep_log_dir(
+    max_age: Optional[float] = None, max_bytes: Optional[int] = None
+) -> Tuple[int, int]:
+    """
+    enforce the retention limits on LOG_DIR; returns (files removed, bytes freed)
+    """
+    if max_age is None:
+        max_age = LOG_RETENTION_DAYS * 86400
+    if max_bytes is None:
+        max_bytes = int(LOG_MAX_MB * 1024 * 1024)
+
+    files, total = _scan_log_dir()
+    # sidecars go with their image; orphaned ones are swept like any other file
+    paths = {path for _, _, path in files}
+    candidates = sorted(
+        (mtime, path)
+        for mtime, _, path in files
+        if not (path.endswith(SIDECAR_SUFFIXES) and path[: path.rfind(".")] in paths)
+    )
+
+    now = time.time()
+    removed = 0
+    freed = 0
+    for mtime, path in candidates:
+        too_old = max_age and now - mtime > max_age
+        too_big = max_bytes and total - freed > max_bytes
+        if not (too_old or too_big):
+            # candidates are oldest first: nothing after this one is due either
+            break
+        freed += _remove(path)
+        removed += 1
+
+    _remove_empty_dirs()
+    if removed:
+        logger.info(f"log sweep removed {removed} files ({freed} bytes)")
+    return removed, freed
+
+
+async def run_retention_sweep() -> None:
+    """
+    background retention loop (started from the FastAPI lifespan)
+    """
+    while True:
+        try:
+            await run_in_threadpool(sweep_log_dir)
+            await run_in_threadpool(cleanup_temp, TEMP_MAX_AGE_HOURS * 3600)
+            await run_in_threadpool(result_cache.prune_disk)
+        except Exception as e:
+            logger.error(f"storage sweep failed: {str(e)}")
+        await asyncio.sleep(STORAGE_SWEEP_INTERVAL)
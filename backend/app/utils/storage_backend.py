@@ -0,0 +1,120 @@
+import io
+import logging
+import mimetypes
+import os
+from typing import Optional
+
+from app.utils.storage import log_path
+
+logger = logging.getLogger(__name__)
+
+# where result images (and their stored boxes) are kept, addressed by storage key:
+# - local: LOG_DIR on this node (served by /log and /result_image)
+# - s3:    an S3-compatible bucket, so API nodes don't need a shared disk
+#          (retention there is the bucket's lifecycle policy, not the local sweep)
+
+# local | s3
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "results/")
+S3_REGION = os.getenv("S3_REGION")
+# e.g. http://localhost:9000 for MinIO or a moto server
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+# uploads above the threshold are sent as concurrent multipart chunks
+S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8"))
+S3_MULTIPART_CHUNK_MB = int(os.getenv("S3_MULTIPART_CHUNK_MB", "8"))
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "4"))
+
+
+class StorageBackend:
+    def put(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        stored bytes for key, or None when it does not exist
+        """
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    def put(self, key: str, data: bytes) -> None:
+        path = log_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(log_path(key), "rb") as f:
+                return f.read()
+        except (ValueError, FileNotFoundError):
+            return None
+
+
+class S3Storage(StorageBackend):
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+    ):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        # the client is thread-safe and shared by all render workers; its connection
+        # pool has to cover every worker's concurrent multipart parts
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            config=Config(max_pool_connections=max(10, S3_UPLOAD_CONCURRENCY * 4)),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            multipart_chunksize=S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+            max_concurrency=S3_UPLOAD_CONCURRENCY,
+        )
+        self._missing = self.client.exceptions.NoSuchKey
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def put(self, key: str, data: bytes) -> None:
+        # streamed from memory: large objects go up as multipart chunks, no temp file
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        self.client.upload_fileobj(
+            io.BytesIO(data),
+            self.bucket,
+            self._key(key),
+            ExtraArgs={"ContentType": content_type},
+            Config=self.transfer_config,
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except self._missing:
+            return None
+        return response["Body"].read()
+
+
+def create_backend(name: str) -> StorageBackend:
+    if name == "local":
+        return LocalStorage()
+    if name == "s3":
+        return S3Storage(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION)
+    raise ValueError(f"unknown STORAGE_BACKEND: {name}")
+
+
+backend = create_backend(STORAGE_BACKEND)
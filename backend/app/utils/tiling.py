@@ -0,0 +1,115 @@
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from app.utils.batching import INFERENCE_MAX_BATCH_SIZE
+
+# sliced inference for high-resolution images: small objects (a few dozen pixels of fire in a
+# wide-angle shot) vanish when the whole frame is letterboxed to the model size, so the image
+# is cut into overlapping model-sized tiles, the tiles are run as one batch and the boxes are
+# merged back with class-wise NMS.
+
+TILE_SIZE = int(os.getenv("TILE_SIZE", "640"))
+TILE_OVERLAP = float(os.getenv("TILE_OVERLAP", "0.2"))  # fraction of the tile size
+# upper bounds per image: tiles are model passes, so these bound the work of one request
+TILE_MAX_OVERLAP = 0.5
+TILE_MAX_COUNT = int(os.getenv("TILE_MAX_COUNT", "64"))
+# also run the whole (letterboxed) image, which keeps objects larger than a tile
+TILE_FULL_IMAGE = os.getenv("TILE_FULL_IMAGE", "1") == "1"
+TILE_NMS_IOU = float(os.getenv("TILE_NMS_IOU", "0.5"))
+# ios (intersection over the smaller box) also removes the partial boxes of an object cut
+# by a tile border; iou is the classic criterion
+TILE_NMS_METRIC = os.getenv("TILE_NMS_METRIC", "ios").lower()
+
+
+def tile_starts(length: int, size: int, stride: int) -> List[int]:
+    if length <= size:
+        return [0]
+    starts = list(range(0, length - size, stride))
+    # last tile is aligned to the border instead of running past it
+    starts.append(length - size)
+    return starts
+
+
+def tile_count(height: int, width: int, size: int, overlap: float) -> int:
+    """
+    number of tiles tile_windows makes, without building them
+    """
+    stride = max(1, int(size * (1 - overlap)))
+    return len(tile_starts(height, size, stride)) * len(tile_starts(width, size, stride))
+
+
+def tile_windows(height: int, width: int, size: int, overlap: float) -> List[Tuple[int, int, int, int]]:
+    """
+    (x1, y1, x2, y2) windows of size x size covering the image with the given overlap
+    """
+    stride = max(1, int(size * (1 - overlap)))
+    return [
+        (x, y, min(x + size, width), min(y + size, height))
+        for y in tile_starts(height, size, stride)
+        for x in tile_starts(width, size, stride)
+    ]
+
+
+def nms(boxes: np.ndarray, iou: float, metric: str = TILE_NMS_METRIC) -> np.ndarray:
+    """
+    class-wise NMS over (N, 6) [x1, y1, x2, y2, conf, cls] rows; returns kept rows by confidence
+    """
+    if not len(boxes):
+        return boxes
+    # offset each class into its own coordinate range so one pass never merges classes
+    offsets = boxes[:, 5:6] * (boxes[:, :4].max() + 1)
+    xyxy = boxes[:, :4] + offsets
+    areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+
+    order = np.argsort(-boxes[:, 4])
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        tl = np.maximum(xyxy[i, :2], xyxy[rest, :2])
+        br = np.minimum(xyxy[i, 2:], xyxy[rest, 2:])
+        inter = np.clip(br - tl, 0, None).prod(axis=1)
+        if metric == "ios":
+            union = np.minimum(areas[i], areas[rest])
+        else:
+            union = areas[i] + areas[rest] - inter
+        overlap = inter / np.maximum(union, 1e-9)
+        order = rest[overlap <= iou]
+    return boxes[keep]
+
+
+def sliced_predict(
+    model,
+    img: np.ndarray,
+    tile_size: int = TILE_SIZE,
+    overlap: float = TILE_OVERLAP,
+    full_image: bool = TILE_FULL_IMAGE,
+    iou: float = TILE_NMS_IOU,
+) -> np.ndarray:
+    """
+    run model over overlapping tiles of img (plus the full image); returns merged
+    (N, 6) [x1, y1, x2, y2, conf, cls] boxes in image coordinates
+    """
+    height, width = img.shape[:2]
+    count = tile_count(height, width, tile_size, overlap)
+    if count > TILE_MAX_COUNT:
+        raise ValueError(f"{count} tiles exceed TILE_MAX_COUNT ({TILE_MAX_COUNT})")
+    windows = tile_windows(height, width, tile_size, overlap)
+    if full_image and len(windows) > 1:
+        windows.append((0, 0, width, height))
+
+    merged = []
+    for start in range(0, len(windows), INFERENCE_MAX_BATCH_SIZE):
+        chunk = windows[start : start + INFERENCE_MAX_BATCH_SIZE]
+        tiles = [img[y1:y2, x1:x2] for x1, y1, x2, y2 in chunk]
+        results = model(tiles, batch=len(tiles), verbose=False)
+        for (x1, y1, _, _), result in zip(chunk, results):
+            boxes = result.boxes.data.cpu().numpy()[:, :6].astype(np.float32)
+            boxes[:, [0, 2]] += x1
+            boxes[:, [1, 3]] += y1
+            merged.append(boxes)
+
+    return nms(np.concatenate(merged), iou)
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.api.detection.crud import save_events
+from app.db.database import AsyncSessionLocal
+from app.utils.postprocess import Detections, box_iou
+
+logger = logging.getLogger(__name__)
+
+# temporal tracking for camera streams: detections of consecutive frames are associated by
+# class and box IoU into tracks, and each track becomes one detection event that is written
+# when it opens and when it closes (not seen for TRACK_TIMEOUT seconds), instead of one
+# detection log per frame.
+#
+# state is per process: with several API workers, route a camera to one worker (sticky).
+
+# minimum IoU between a track's last box and a new box of the same class
+TRACK_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", "0.3"))
+# seconds without a matching box before an event closes
+TRACK_TIMEOUT = float(os.getenv("TRACK_TIMEOUT", "5"))
+# frames a track needs before its event opens (filters single-frame false positives)
+TRACK_MIN_HITS = int(os.getenv("TRACK_MIN_HITS", "1"))
+# seconds between sweeps that close events of cameras that stopped sending frames
+TRACK_SWEEP_INTERVAL = float(os.getenv("TRACK_SWEEP_INTERVAL", "1"))
+
+# (user_id, camera_id)
+CameraKey = Tuple[str, str]
+
+
+class Track:
+    __slots__ = (
+        "event_id",
+        "camera",
+        "class_name",
+        "bbox",
+        "started_at",
+        "last_seen",
+        "hits",
+        "opened",
+        "peak_confidence",
+        "peak_bbox",
+        "peak_frame",
+    )
+
+    def __init__(self, camera: CameraKey, class_name: str, bbox: list, confidence: float, now: float, frame):
+        self.event_id = str(uuid.uuid4())
+        self.camera = camera
+        self.class_name = class_name
+        self.bbox = bbox
+        self.started_at = now
+        self.last_seen = now
+        self.hits = 1
+        self.opened = False
+        self.peak_confidence = confidence
+        self.peak_bbox = bbox
+        # kept in memory only; rendered once as the event's image when it closes
+        self.peak_frame = frame
+
+    def update(self, bbox: list, confidence: float, now: float, frame) -> None:
+        self.bbox = bbox
+        self.last_seen = now
+        self.hits += 1
+        if confidence > self.peak_confidence:
+            self.peak_confidence = confidence
+            self.peak_bbox = bbox
+            self.peak_frame = frame
+
+
+class CameraTracker:
+    def __init__(self, camera: CameraKey):
+        self.camera = camera
+        self.tracks: List[Track] = []
+        self.last_update = 0.0
+
+    def update(
+        self, detections: Detections, frame=None, now: Optional[float] = None
+    ) -> Tuple[List[Track], List[Track]]:
+        """
+        associate a frame's detections with the open tracks; returns (opened, closed) tracks
+        """
+        now = time.time() if now is None else now
+        self.last_update = now
+        names = detections.names[detections.class_id] if len(detections) else np.array([])
+        touched = []
+
+        for class_name in np.unique(names).tolist():
+            indices = np.flatnonzero(names == class_name)
+            tracks = [t for t in self.tracks if t.class_name == class_name]
+            assigned = self._associate(detections.xyxy[indices], tracks)
+            for index, track in zip(indices.tolist(), assigned):
+                bbox = detections.xyxy[index].tolist()
+                confidence = float(detections.confidence[index])
+                if track is None:
+                    track = Track(self.camera, class_name, bbox, confidence, now, frame)
+                    self.tracks.append(track)
+                else:
+                    track.update(bbox, confidence, now, frame)
+                touched.append(track)
+
+        opened = []
+        for track in touched:
+            if not track.opened and track.hits >= TRACK_MIN_HITS:
+                track.opened = True
+                opened.append(track)
+        return opened, self.expire(now)
+
+    def _associate(self, boxes: np.ndarray, tracks: List[Track]) -> List[Optional[Track]]:
+        """
+        greedy one-to-one matching by IoU, highest overlap first; None opens a new track
+        """
+        assigned: List[Optional[Track]] = [None] * len(boxes)
+        if not tracks:
+            return assigned
+        ious = box_iou(boxes, np.array([t.bbox for t in tracks], dtype=np.float32))
+        while True:
+            b, t = np.unravel_index(np.argmax(ious), ious.shape)
+            if ious[b, t] < TRACK_IOU_THRESHOLD:
+                return assigned
+            assigned[b] = tracks[t]
+            ious[b, :] = -1
+            ious[:, t] = -1
+
+    def expire(self, now: float, timeout: float = TRACK_TIMEOUT) -> List[Track]:
+        """
+        drop tracks not seen for timeout seconds; returns the ones whose events were open
+        """
+        stale = [t for t in self.tracks if now - t.last_seen > timeout]
+        if stale:
+            self.tracks = [t for t in self.tracks if now - t.last_seen <= timeout]
+        return [t for t in stale if t.opened]
+
+
+class EventTracker:
+    """
+    camera trackers of this process, keyed by (user_id, camera_id)
+    """
+
+    def __init__(self):
+        self._cameras: Dict[CameraKey, CameraTracker] = {}
+
+    def update(
+        self, camera: CameraKey, detections: Detections, frame=None
+    ) -> Tuple[List[Track], List[Track]]:
+        tracker = self._cameras.get(camera)
+        if tracker is None:
+            tracker = self._cameras[camera] = CameraTracker(camera)
+        return tracker.update(detections, frame)
+
+    def expire(self, now: Optional[float] = None) -> List[Track]:
+        """
+        close timed-out events of all cameras, including cameras that stopped sending
+        """
+        now = time.time() if now is None else now
+        closed = []
+        for camera, tracker in list(self._cameras.items()):
+            closed.extend(tracker.expire(now))
+            if not tracker.tracks:
+                del self._cameras[camera]
+        return closed
+
+    def close_camera(self, camera: CameraKey) -> List[Track]:
+        tracker = self._cameras.pop(camera, None)
+        if tracker is None:
+            return []
+        return tracker.expire(float("inf"), timeout=-1)
+
+    def close_all(self) -> List[Track]:
+        closed = []
+        for camera in list(self._cameras):
+            closed.extend(self.close_camera(camera))
+        return closed
+
+
+event_tracker = EventTracker()
+
+
+async def close_tracks(closed: List[Track]) -> None:
+    if not closed:
+        return
+    async with AsyncSessionLocal() as db:
+        await save_events(db, [], closed)
+
+
+async def run_event_sweep() -> None:
+    """
+    background loop closing timed-out events (started from the FastAPI lifespan)
+    """
+    while True:
+        await asyncio.sleep(TRACK_SWEEP_INTERVAL)
+        try:
+            await close_tracks(event_tracker.expire())
+        except Exception as e:
+            logger.error(f"detection event sweep failed: {str(e)}")
@@ -0,0 +1,146 @@
+import logging
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.utils.batching import INFERENCE_MAX_BATCH_SIZE
+from app.utils.model_registry import get_model
+from app.utils.postprocess import Detections
+
+logger = logging.getLogger(__name__)
+
+# video analysis shared by POST /detect/upload (in the request) and background video jobs
+# (in worker processes, see video_jobs.py)
+
+# seconds between progress checkpoints written by a job worker
+VIDEO_JOB_CHECKPOINT_INTERVAL = float(os.getenv("VIDEO_JOB_CHECKPOINT_INTERVAL", "2"))
+
+# called after each batch with (frames consumed so far, [(frame index, detections)])
+BatchCallback = Callable[[int, List[Tuple[int, Detections]]], None]
+
+
+def analyze_video(
+    path: str,
+    frame_stride: int,
+    start_frame: int = 0,
+    on_batch: Optional[BatchCallback] = None,
+) -> Detections:
+    """
+    detections of every frame_stride-th frame, starting at start_frame (resume position)
+    """
+    cap = cv2.VideoCapture(path)
+    model = get_model("fire")
+    all_detections = [Detections.from_array(np.empty((0, 6)), model.names)]
+    batch = []
+    indices = []
+    frame_count = start_frame
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    def flush():
+        detections = _detect_frames(model, batch)
+        all_detections.extend(detections)
+        if on_batch is not None:
+            on_batch(frame_count, list(zip(indices, detections)))
+        batch.clear()
+        indices.clear()
+
+    try:
+        while True:
+            # grab() only demuxes; frames are decoded with retrieve() when sampled
+            if not cap.grab():
+                break
+
+            if frame_count % frame_stride == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    batch.append(frame)
+                    indices.append(frame_count)
+            frame_count += 1
+
+            if len(batch) >= INFERENCE_MAX_BATCH_SIZE:
+                flush()
+
+        if batch:
+            flush()
+        elif on_batch is not None:
+            # report the final position even when no sampled frame is left
+            on_batch(frame_count, [])
+    finally:
+        cap.release()
+
+    logger.info(
+        f"Video analyzed: frames {start_frame}-{frame_count}, stride {frame_stride}"
+    )
+    return Detections.concatenate(all_detections)
+
+
+def _detect_frames(model, frames: list) -> List[Detections]:
+    return [
+        Detections.from_result(result, model.names)
+        for result in model(frames, batch=len(frames), verbose=False)
+    ]
+
+
+def count_frames(path: str) -> int:
+    """
+    frame count from the container (an estimate; 0 when unknown)
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        return max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+    finally:
+        cap.release()
+
+
+def run_video_job(job_id: str) -> int:
+    """
+    worker process entry point: analyze a job's video from its last checkpoint, writing
+    progress and new detections to the database; returns the frames processed
+    """
+    from app.api.video_job.crud import add_job_detections
+    from app.db.database import SessionLocal
+    from app.db.models.video_job import JOB_RUNNING, VideoJob
+
+    db = SessionLocal()
+    try:
+        job = db.get(VideoJob, job_id)
+        job.status = JOB_RUNNING
+        if not job.total_frames:
+            job.total_frames = count_frames(job.video_path)
+        db.commit()
+
+        last_checkpoint = time.monotonic()
+        frames_done = job.processed_frames
+        # detections found since the last checkpoint
+        pending: List[dict] = []
+
+        def save(frames: int):
+            # new detections and resume position are committed together
+            add_job_detections(db, job_id, pending)
+            job.detection_count = (job.detection_count or 0) + len(pending)
+            job.processed_frames = frames
+            db.commit()
+            pending.clear()
+
+        def checkpoint(frames: int, batch: List[Tuple[int, Detections]]):
+            nonlocal last_checkpoint, frames_done
+            frames_done = frames
+            for index, frame_detections in batch:
+                pending.extend({**d, "frame": index} for d in frame_detections.to_list())
+            if time.monotonic() - last_checkpoint < VIDEO_JOB_CHECKPOINT_INTERVAL:
+                return
+            save(frames)
+            last_checkpoint = time.monotonic()
+
+        analyze_video(job.video_path, job.frame_stride, job.processed_frames, checkpoint)
+
+        # frames actually read; the container count is only an estimate
+        job.total_frames = frames_done
+        save(frames_done)
+        return frames_done
+    finally:
+        db.close()
@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import or_, select, update
+
+from app.api.predict_fire.crud import add_detection_log, increment_detection_counts
+from app.db.database import AsyncSessionLocal
+from app.api.video_job.crud import get_job_detections
+from app.db.models.video_job import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    VideoJob,
+    utc_now,
+)
+from app.utils.postprocess import Detections, build_detection_log
+from app.utils.video import run_video_job
+
+logger = logging.getLogger(__name__)
+
+# background video analysis (POST /video_jobs): a pool of worker processes decodes and runs
+# the model, so long videos neither hold an HTTP connection open nor block API workers.
+# workers checkpoint progress to the video_jobs table. every job is owned by one runner
+# (API process) through a renewed lease; jobs whose owner stopped or died are claimed by
+# another runner and resumed from their last checkpoint.
+
+VIDEO_JOB_WORKERS = int(os.getenv("VIDEO_JOB_WORKERS", "2"))
+# torch / OpenCV threads per worker process (0 = library default, i.e. all cores)
+VIDEO_JOB_THREADS = int(os.getenv("VIDEO_JOB_THREADS", "0"))
+# seconds a runner holds a job without renewing (renewed every third of it)
+VIDEO_JOB_LEASE = float(os.getenv("VIDEO_JOB_LEASE", "60"))
+# runs of a job interrupted by worker crashes before it is failed
+VIDEO_JOB_MAX_ATTEMPTS = int(os.getenv("VIDEO_JOB_MAX_ATTEMPTS", "2"))
+
+
+def _init_worker(threads: int) -> None:
+    logging.basicConfig(level=logging.INFO)
+    if threads <= 0:
+        return
+    import cv2
+    import torch
+
+    # several workers share the machine: keep each one from claiming every core
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+
+
+def remove_video(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"failed to remove job video {path}: {str(e)}")
+
+
+def lease_expiry() -> datetime:
+    return utc_now() + timedelta(seconds=VIDEO_JOB_LEASE)
+
+
+class VideoJobRunner:
+    def __init__(self, workers: int, threads: int):
+        self.workers = max(1, workers)
+        self.threads = threads
+        # identifies this process as the owner of the jobs it runs
+        self.owner = str(uuid.uuid4())
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._attempts: Dict[str, int] = {}
+        self._lease_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that already runs an event loop and thread pools is unsafe
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.threads,),
+        )
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """
+        a pool stays unusable once one of its processes died (segfault, OOM kill)
+        """
+        if self._pool is broken:
+            logger.warning("video job worker process died, restarting the worker pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._create_pool()
+        return self._pool
+
+    async def start(self) -> None:
+        self._pool = self._create_pool()
+        # claims unfinished jobs (also those of a previous run) and renews the leases
+        self._lease_task = asyncio.create_task(self._maintain_leases())
+        logger.info(f"video job workers started: {self.workers}")
+
+    async def claim(self, job_id: str) -> bool:
+        """
+        take over an unfinished job that has no live owner; atomic, so with several API
+        processes (uvicorn --workers) only one of them runs the job
+        """
+        now = utc_now()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(VideoJob)
+                .where(
+                    VideoJob.id == job_id,
+                    VideoJob.status.in_([JOB_QUEUED, JOB_RUNNING]),
+                    or_(
+                        VideoJob.owner.is_(None),
+                        VideoJob.lease_until.is_(None),
+                        VideoJob.lease_until < now,
+                    ),
+                )
+                .values(owner=self.owner, lease_until=lease_expiry())
+            )
+            await db.commit()
+        return result.rowcount == 1
+
+    async def _maintain_leases(self) -> None:
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    if self._tasks:
+                        await db.execute(
+                            update(VideoJob)
+                            .where(
+                                VideoJob.id.in_(list(self._tasks)),
+                                VideoJob.owner == self.owner,
+                            )
+                            .values(lease_until=lease_expiry())
+                        )
+                        await db.commit()
+                    result = await db.execute(
+                        select(VideoJob.id)
+                        .where(
+                            VideoJob.status.in_([JOB_QUEUED, JOB_RUNNING]),
+                            or_(
+                                VideoJob.owner.is_(None),
+                                VideoJob.lease_until.is_(None),
+                                VideoJob.lease_until < utc_now(),
+                            ),
+                        )
+                        .order_by(VideoJob.created_at)
+                    )
+                    orphaned = list(result.scalars().all())
+                for job_id in orphaned:
+                    if job_id not in self._tasks and await self.claim(job_id):
+                        logger.info(f"video job {job_id} resumed")
+                        self.submit(job_id)
+            except Exception as e:
+                logger.error(f"video job lease update failed: {str(e)}")
+            await asyncio.sleep(VIDEO_JOB_LEASE / 3)
+
+    def submit(self, job_id: str) -> None:
+        """
+        run a job this runner owns (created by it, or claimed)
+        """
+        pool = self._pool
+        try:
+            future = pool.submit(run_video_job, job_id)
+        except BrokenProcessPool:
+            pool = self._replace_pool(pool)
+            future = pool.submit(run_video_job, job_id)
+        self._attempts[job_id] = self._attempts.get(job_id, 0) + 1
+        task = asyncio.create_task(self._finish(job_id, pool, asyncio.wrap_future(future)))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda done: self._forget(job_id, done))
+
+    def _forget(self, job_id: str, task: asyncio.Task) -> None:
+        # a resubmitted job already has a new task
+        if self._tasks.get(job_id) is task:
+            del self._tasks[job_id]
+
+    async def stop(self) -> None:
+        """
+        stop the workers; unfinished jobs keep their checkpoint and are resumed by the next
+        runner that starts (or by a sibling process right away)
+        """
+        if self._pool is None:
+            return
+        self._lease_task.cancel()
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(self._lease_task, *self._tasks.values(), return_exceptions=True)
+
+        # give the jobs up instead of letting the lease run out
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(VideoJob)
+                    .where(
+                        VideoJob.owner == self.owner,
+                        VideoJob.status.in_([JOB_QUEUED, JOB_RUNNING]),
+                    )
+                    .values(owner=None, lease_until=None)
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"failed to release video jobs: {str(e)}")
+
+        # no public way to stop a running task before Python 3.14 (terminate_workers)
+        processes = list((self._pool._processes or {}).values())
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        self._pool = None
+
+    async def _finish(self, job_id: str, pool: ProcessPoolExecutor, future: asyncio.Future) -> None:
+        try:
+            await future
+        except asyncio.CancelledError:
+            raise
+        except BrokenProcessPool:
+            # every job of the pool fails with this, not only the one that crashed it:
+            # resume from the checkpoint in a fresh pool, a few times
+            self._replace_pool(pool)
+            if self._attempts.get(job_id, 0) < VIDEO_JOB_MAX_ATTEMPTS:
+                logger.warning(f"video job {job_id} interrupted by a worker crash, retrying")
+                self.submit(job_id)
+                return
+            self._attempts.pop(job_id, None)
+            logger.error(f"video job {job_id} failed: worker process crashed")
+            await self._mark_failed(job_id, "worker process crashed")
+            return
+        except Exception as e:
+            self._attempts.pop(job_id, None)
+            logger.error(f"video job {job_id} failed: {str(e)}")
+            await self._mark_failed(job_id, str(e) or e.__class__.__name__)
+            return
+
+        self._attempts.pop(job_id, None)
+        try:
+            async with AsyncSessionLocal() as db:
+                job = await db.get(VideoJob, job_id)
+                detections = Detections.from_list(await get_job_detections(db, job_id))
+                detection_data = build_detection_log(
+                    detections, "Video processing completed", file_name=job.file_name
+                )
+                # the detection log and the finished job are committed together
+                _, keys = add_detection_log(db, detection_data)
+                await increment_detection_counts(db, keys)
+                job.status = JOB_DONE
+                job.log_id = detection_data["id"]
+                await db.commit()
+                video_path = job.video_path
+        except Exception as e:
+            logger.error(f"failed to save video job {job_id}: {str(e)}")
+            await self._mark_failed(job_id, "failed to save detection log")
+            return
+
+        remove_video(video_path)
+        logger.info(f"video job {job_id} done: {len(detections)} detections")
+
+    async def _mark_failed(self, job_id: str, error: str) -> None:
+        async with AsyncSessionLocal() as db:
+            job = await db.get(VideoJob, job_id)
+            if job is None:
+                return
+            job.status = JOB_FAILED
+            job.error = error
+            await db.commit()
+            remove_video(job.video_path)
+
+
+video_jobs = VideoJobRunner(VIDEO_JOB_WORKERS, VIDEO_JOB_THREADS)